@@ -1,30 +1,209 @@
-from flask import Flask
-from flask_cors import CORS
-import threading
+from aiohttp import web
+import logging
+import math
+import os
+import time
 
-app = Flask(__name__)
-CORS(app)
+from utils.logging_setup import dropped_records
+from utils.profiler import profiler
 
-@app.route('/health', methods=['GET','POST'])
-def health_check():
-    """Simple health check endpoint - returns 200 OK"""
-    return 'hello i am working', 200
+logger = logging.getLogger('AlienBot.health')
 
-@app.route('/', methods=['GET'])
-def root():
+# Max gateway heartbeat latency (seconds) before /ready reports not ready
+READY_MAX_LATENCY = float(os.getenv("READY_MAX_LATENCY", "2.0"))
+# /debug/profile is disabled unless PROFILE_TOKEN is set; requests must send "Authorization: Bearer <token>"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+_runner = None
+_started_at = time.monotonic()
+_metrics_providers = []
+
+
+def register_metrics_provider(provider):
+    """Register a callable returning extra Prometheus text lines for /metrics"""
+    _metrics_providers.append(provider)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Allow any origin, like the old flask_cors setup"""
+    response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def _gateway_latency(bot):
+    """bot.latency in seconds, or None when no heartbeat has been acknowledged yet"""
+    latency = bot.latency
+    if latency is None or math.isinf(latency) or math.isnan(latency):
+        return None
+    return latency
+
+
+def _shard_states(bot):
+    """Per-shard latency/connection state for AutoShardedBot, or None for a single-shard bot"""
+    shards = getattr(bot, 'shards', None)
+    if not shards:
+        return None
+    states = {}
+    for shard_id, info in shards.items():
+        latency = info.latency
+        states[shard_id] = {
+            'latency': None if math.isinf(latency) or math.isnan(latency) else latency,
+            'connected': not info.is_closed(),
+            'ws_ratelimited': info.is_ws_ratelimited(),
+        }
+    return states
+
+
+async def health_check(request):
+    """Liveness: the event loop is serving requests"""
+    return web.Response(text='hello i am working')
+
+
+async def root(request):
     """Root endpoint - returns 200 OK"""
-    return '', 200
-
-def start_health_api(host='0.0.0.0', port=5000):
-    """Start the health API server in a separate thread"""
-    def run_api():
-        app.run(host=host, port=port, debug=False, use_reloader=False)
-    
-    api_thread = threading.Thread(target=run_api, daemon=True)
-    api_thread.start()
-    print(f"🏥 Health API started on http://{host}:{port}")
-    print(f"📊 Health check: http://{host}:{port}/health")
-    return api_thread
-
-if __name__ == "__main__":
-    start_health_api()
\ No newline at end of file
+    return web.Response(text='')
+
+
+async def ready_check(request):
+    """Readiness: gateway connected, cogs loaded, latency under READY_MAX_LATENCY"""
+    bot = request.app['bot']
+    latency = _gateway_latency(bot)
+    checks = {
+        'gateway_connected': bot.is_ready() and not bot.is_closed(),
+        'cogs_loaded': getattr(bot, 'cogs_loaded', False),
+        'latency_ok': latency is not None and latency < READY_MAX_LATENCY,
+    }
+    guild_config = getattr(bot, 'guild_config', None)
+    if guild_config is not None:
+        checks['guild_config_loaded'] = guild_config.loaded
+    shards = _shard_states(bot)
+    if shards is not None:
+        checks['shards_connected'] = all(state['connected'] for state in shards.values())
+        checks['latency_ok'] = all(state['latency'] is not None and state['latency'] < READY_MAX_LATENCY
+                                   for state in shards.values())
+    ready = all(checks.values())
+    body = {'ready': ready, 'checks': checks, 'latency': latency, 'shards': shards}
+    return web.json_response(body, status=200 if ready else 503)
+
+
+def _core_metrics(bot):
+    latency = _gateway_latency(bot)
+    lines = [
+        '# HELP alienbot_up Whether the health server is running',
+        '# TYPE alienbot_up gauge',
+        'alienbot_up 1',
+        '# HELP alienbot_uptime_seconds Seconds since the process started',
+        '# TYPE alienbot_uptime_seconds gauge',
+        f'alienbot_uptime_seconds {time.monotonic() - _started_at:.3f}',
+        '# HELP alienbot_gateway_ready Whether the gateway session is ready',
+        '# TYPE alienbot_gateway_ready gauge',
+        f'alienbot_gateway_ready {int(bot.is_ready() and not bot.is_closed())}',
+        '# HELP alienbot_gateway_latency_seconds Gateway heartbeat latency',
+        '# TYPE alienbot_gateway_latency_seconds gauge',
+        f'alienbot_gateway_latency_seconds {latency if latency is not None else "NaN"}',
+        '# HELP alienbot_guilds Number of guilds the bot is in',
+        '# TYPE alienbot_guilds gauge',
+        f'alienbot_guilds {len(bot.guilds)}',
+        '# HELP alienbot_log_records_dropped_total Log records dropped by the logging queue',
+        '# TYPE alienbot_log_records_dropped_total counter',
+        f'alienbot_log_records_dropped_total {dropped_records()}',
+    ]
+    guild_config = getattr(bot, 'guild_config', None)
+    if guild_config is not None:
+        lines.append('# HELP alienbot_guild_configs Guilds with their own channel configuration')
+        lines.append('# TYPE alienbot_guild_configs gauge')
+        lines.append(f'alienbot_guild_configs {len(guild_config.snapshot())}')
+    shards = _shard_states(bot)
+    if shards is not None:
+        lines.append('# HELP alienbot_shard_latency_seconds Gateway heartbeat latency per shard')
+        lines.append('# TYPE alienbot_shard_latency_seconds gauge')
+        for shard_id, state in shards.items():
+            value = state['latency'] if state['latency'] is not None else 'NaN'
+            lines.append(f'alienbot_shard_latency_seconds{{shard="{shard_id}"}} {value}')
+        lines.append('# HELP alienbot_shard_connected Whether each shard websocket is open')
+        lines.append('# TYPE alienbot_shard_connected gauge')
+        for shard_id, state in shards.items():
+            lines.append(f'alienbot_shard_connected{{shard="{shard_id}"}} {int(state["connected"])}')
+    return lines
+
+
+async def shards_status(request):
+    """Per-shard state for this process"""
+    bot = request.app['bot']
+    return web.json_response({
+        'shard_ids': getattr(bot, 'shard_ids', None),
+        'shard_count': bot.shard_count,
+        'shards': _shard_states(bot),
+    })
+
+
+async def metrics(request):
+    """Prometheus text exposition format"""
+    bot = request.app['bot']
+    lines = _core_metrics(bot)
+    for provider in _metrics_providers:
+        try:
+            lines.extend(provider())
+        except Exception as e:
+            logger.error(f"❌ Metrics provider {provider!r} failed: {e}")
+    return web.Response(text='\n'.join(lines) + '\n', content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
+
+
+async def debug_profile(request):
+    """Run the sampling profiler for ?seconds=N and return collapsed stacks"""
+    if not PROFILE_TOKEN:
+        raise web.HTTPNotFound()
+    if request.headers.get('Authorization') != f'Bearer {PROFILE_TOKEN}':
+        raise web.HTTPUnauthorized()
+    try:
+        seconds = float(request.query.get('seconds', '10'))
+    except ValueError:
+        raise web.HTTPBadRequest(text='seconds must be a number')
+    try:
+        path, _ = await profiler.profile(seconds)
+    except RuntimeError as e:
+        raise web.HTTPConflict(text=str(e))
+    return web.FileResponse(path, headers={'Content-Type': 'text/plain; charset=utf-8'})
+
+
+def create_app(bot):
+    """Build the aiohttp application for the health API"""
+    app = web.Application(middlewares=[cors_middleware])
+    app['bot'] = bot
+    app.router.add_route('GET', '/health', health_check)
+    app.router.add_route('POST', '/health', health_check)
+    app.router.add_get('/ready', ready_check)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/shards', shards_status)
+    app.router.add_get('/debug/profile', debug_profile)
+    app.router.add_get('/', root)
+    return app
+
+
+async def start_health_api(bot, host='0.0.0.0', port=None):
+    """Start the health API on the bot's own event loop (only the first call binds the port)"""
+    global _runner
+    if _runner is not None:
+        return _runner
+
+    port = port or int(os.getenv("HEALTH_PORT", 5000))
+    runner = web.AppRunner(create_app(bot), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    _runner = runner
+
+    logger.info(f"🏥 Health API started on http://{host}:{port}")
+    logger.info(f"📊 Health check: http://{host}:{port}/health, readiness: /ready, metrics: /metrics")
+    return runner
+
+
+async def stop_health_api():
+    """Shut down the health API server"""
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
\ No newline at end of file
@@ -0,0 +1,404 @@
+"""Offline gateway-event replay benchmark for AlienBot.
+
+Drives the real `bot` from main.py (and every cog it loads) with synthetic
+MESSAGE_CREATE / THREAD_CREATE payloads. REST calls go to a local fake
+Discord API served with aiohttp; gateway events are fed straight into the
+ConnectionState parsers, exactly where the websocket would hand them over.
+No token or network access is needed.
+
+Usage (from the bot/ directory):
+    python bench/replay.py                  # run and print results
+    python bench/replay.py --save-baseline  # store results in bench/baseline.json
+    python bench/replay.py --compare        # exit 1 if worse than the baseline
+    python bench/replay.py --compare-ref master  # exit 1 if worse than a git revision
+
+Absolute numbers depend on the host, so baseline.json is only meaningful on
+the machine that recorded it. For CI use --compare-ref: it checks the given
+revision out into a temporary git worktree and runs the same harness against
+it and against this tree, interleaved, on the same host, and compares the
+medians of --rounds runs each.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+GUILD_ID = 900000000000000001
+CHANNEL_ID = 900000000000000002
+FORUM_ID = 900000000000000003
+BOT_USER_ID = 900000000000000005
+APP_OWNER_ID = 900000000000000006
+
+# Metrics where a higher value is better; everything else is "lower is better"
+HIGHER_IS_BETTER = {'messages_per_sec', 'commands_per_sec'}
+
+# Absolute differences below these are treated as timer noise, by metric suffix
+NOISE_FLOOR = {'_ms': 10.0, '_s': 0.1, '_mb': 25.0}
+
+
+class Snowflakes:
+    """Monotonic snowflake generator"""
+
+    def __init__(self):
+        self._next = 1000000000000000000
+
+    def __call__(self):
+        self._next += 1 << 22
+        return self._next
+
+
+def _user(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': name,
+            'avatar': None, 'bot': bot}
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def guild_payload():
+    base = {'guild_id': str(GUILD_ID), 'position': 0, 'permission_overwrites': [], 'nsfw': False, 'parent_id': None}
+    return {
+        'id': str(GUILD_ID), 'name': 'Bench Guild', 'owner_id': str(APP_OWNER_ID), 'icon': None,
+        'member_count': 2, 'features': [], 'emojis': [], 'stickers': [], 'members': [], 'threads': [],
+        'roles': [{'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '1024', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [
+            dict(base, id=str(CHANNEL_ID), name='bot', type=0),
+            dict(base, id=str(FORUM_ID), name='forum', type=15, available_tags=[]),
+        ],
+    }
+
+
+def message_payload(message_id, channel_id, author_id, content):
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(GUILD_ID),
+        'author': _user(author_id, f'user{author_id % 1000}'),
+        'member': {'roles': [], 'joined_at': _now_iso(), 'deaf': False, 'mute': False},
+        'content': content, 'timestamp': _now_iso(), 'edited_timestamp': None, 'tts': False,
+        'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+        'embeds': [], 'pinned': False, 'type': 0,
+    }
+
+
+def thread_payload(thread_id, owner_id, name):
+    return {
+        'id': str(thread_id), 'guild_id': str(GUILD_ID), 'parent_id': str(FORUM_ID), 'owner_id': str(owner_id),
+        'name': name, 'type': 11, 'last_message_id': str(thread_id), 'message_count': 1, 'member_count': 1,
+        'rate_limit_per_user': 0, 'flags': 0, 'newly_created': True,
+        'thread_metadata': {'archived': False, 'auto_archive_duration': 1440, 'archive_timestamp': _now_iso(),
+                            'locked': False},
+    }
+
+
+def _json(data, status=200, headers=None):
+    """JSON response with the exact content-type discord.py expects (no charset suffix)"""
+    return web.Response(body=json.dumps(data).encode('utf-8'), status=status, headers=headers,
+                        content_type='application/json')
+
+
+class FakeDiscord:
+    """Just enough of the Discord REST API for login, tree sync and message sends"""
+
+    def __init__(self, snowflakes):
+        self.snowflakes = snowflakes
+        self.calls = 0
+        self.runner = None
+        self.base = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/api/v10/users/@me', self.me)
+        app.router.add_get('/api/v10/oauth2/applications/@me', self.application)
+        app.router.add_put('/api/v10/applications/{app_id}/commands', self.sync_commands)
+        app.router.add_post('/api/v10/channels/{channel_id}/messages', self.create_message)
+        app.router.add_get('/api/v10/channels/{channel_id}/messages/{message_id}', self.not_found)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f'http://127.0.0.1:{port}/api/v10'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def me(self, request):
+        self.calls += 1
+        return _json(_user(BOT_USER_ID, 'AlienBot', bot=True))
+
+    async def application(self, request):
+        self.calls += 1
+        return _json({
+            'id': str(BOT_USER_ID), 'name': 'AlienBot', 'description': '', 'icon': None,
+            'bot_public': True, 'bot_require_code_grant': False, 'verify_key': '0' * 64,
+            'owner': _user(APP_OWNER_ID, 'owner'), 'flags': 0,
+        })
+
+    async def sync_commands(self, request):
+        self.calls += 1
+        return _json([])
+
+    async def create_message(self, request):
+        self.calls += 1
+        body = await request.json()
+        data = message_payload(self.snowflakes(), request.match_info['channel_id'], BOT_USER_ID, body.get('content') or '')
+        data['author']['bot'] = True
+        data['embeds'] = body.get('embeds') or []
+        headers = {'X-RateLimit-Limit': '5', 'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '0.001',
+                   'X-RateLimit-Bucket': 'bench'}
+        return _json(data, headers=headers)
+
+    async def not_found(self, request):
+        self.calls += 1
+        return _json({'message': 'Unknown Message', 'code': 10008}, status=404)
+
+
+async def drain_events():
+    """Wait until every scheduled discord.py event handler task has finished"""
+    while True:
+        pending = [task for task in asyncio.all_tasks()
+                   if task.get_name().startswith('discord.py:') and not task.done()]
+        if not pending:
+            return
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def replay(count, feed, batch):
+    """Call feed(i) for i in range(count), draining handlers after every `batch` events.
+
+    Bounded batches keep the number of pending handler tasks (and so the RSS
+    measured) close to what a live gateway connection would see.
+    """
+    for start in range(0, count, batch):
+        for i in range(start, min(count, start + batch)):
+            feed(i)
+        await drain_events()
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+async def run_benchmark(messages, commands, threads, batch):
+    snowflakes = Snowflakes()
+    fake = FakeDiscord(snowflakes)
+    await fake.start()
+
+    import discord
+    discord.http.Route.BASE = fake.base
+
+    import main
+    from utils.instrumentation import stats
+    from utils.memory import rss_bytes
+
+    bot = main.bot
+    await bot.login('bench-token')  # runs setup_hook: cogs, tree sync, health API
+    state = bot._connection
+    state._add_guild_from_data(guild_payload())
+    # Same path as !setup_posts in the guild: store row -> routing table and NewPosts channels
+    await bot.guild_config.set(GUILD_ID, FORUM_ID, CHANNEL_ID)
+    author_id = snowflakes()
+
+    # Plain chat through on_message (filtered before process_commands)
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    await replay(messages, lambda i: state.parse_message_create(
+        message_payload(snowflakes(), CHANNEL_ID, author_id, f'hello there {i}')), batch)
+    chat_elapsed = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    # Command dispatch: !joke replies go through the fake REST API
+    started = time.perf_counter()
+    await replay(commands, lambda i: state.parse_message_create(
+        message_payload(snowflakes(), CHANNEL_ID, author_id, '!joke')), batch)
+    command_elapsed = time.perf_counter() - started
+
+    # Forum notifications: THREAD_CREATE followed by the starter MESSAGE_CREATE
+    started = time.perf_counter()
+    def feed_thread(i):
+        thread_id = snowflakes()
+        state.parse_thread_create(thread_payload(thread_id, author_id, f'Bench post {i}'))
+        state.parse_message_create(message_payload(thread_id, thread_id, author_id, f'Starter message {i}'))
+
+    await replay(threads, feed_thread, batch)
+    dispatcher = bot.notification_dispatcher
+    while dispatcher.embeds_sent + dispatcher.send_errors < threads and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.01)
+    notify_elapsed = time.perf_counter() - started
+
+    joke = stats.commands.get('joke')
+    joke_p50, joke_p95, joke_p99 = joke.percentiles(0.5, 0.95, 0.99) if joke else (None, None, None)
+    listener = stats.listeners.get('NewPosts.on_thread_create')
+    listener_p50, listener_p95 = listener.percentiles(0.5, 0.95) if listener else (None, None)
+    notify_p50, notify_p95 = dispatcher.send_latency.percentiles(0.5, 0.95)
+
+    results = {
+        'messages_per_sec': round(messages / chat_elapsed, 1),
+        'commands_per_sec': round(commands / command_elapsed, 1),
+        'command_latency_p50_ms': _ms(joke_p50),
+        'command_latency_p95_ms': _ms(joke_p95),
+        'command_latency_p99_ms': _ms(joke_p99),
+        'thread_handler_p50_ms': _ms(listener_p50),
+        'thread_handler_p95_ms': _ms(listener_p95),
+        'notification_queue_p50_ms': _ms(notify_p50),
+        'notification_queue_p95_ms': _ms(notify_p95),
+        'notification_total_s': round(notify_elapsed, 3),
+        'memory_per_100k_events_mb': round((rss_after - rss_before) / max(messages, 1) * 100000 / 2 ** 20, 2),
+        'rest_calls': fake.calls,
+    }
+
+    await bot.close()
+    await fake.stop()
+    return results
+
+
+def _noise_floor(key):
+    for suffix, floor in NOISE_FLOOR.items():
+        if key.endswith(suffix):
+            return floor
+    return 0.0
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions beyond the tolerance"""
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if not isinstance(base, (int, float)) or not isinstance(current, (int, float)) or base <= 0:
+            continue
+        if key in HIGHER_IS_BETTER:
+            if current < base * (1 - tolerance):
+                regressions.append(f"{key}: {current} < {base} (-{(1 - current / base) * 100:.0f}%)")
+        elif key != 'rest_calls' and current > base * (1 + tolerance) and current - base > _noise_floor(key):
+            regressions.append(f"{key}: {current} > {base} (+{(current / base - 1) * 100:.0f}%)")
+    if results.get('rest_calls', 0) > baseline.get('rest_calls', float('inf')):
+        regressions.append(f"rest_calls: {results['rest_calls']} > {baseline['rest_calls']}")
+    return regressions
+
+
+def run_isolated(bot_dir, args):
+    """Run one benchmark in a fresh interpreter against the bot in bot_dir"""
+    command = [sys.executable, os.path.abspath(__file__), '--bot-dir', bot_dir,
+               '--messages', str(args.messages), '--commands', str(args.commands),
+               '--threads', str(args.threads), '--batch', str(args.batch)]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def median_results(runs):
+    return {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+
+
+def compare_with_revision(revision, args):
+    """(current, reference) median results, with the reference taken from a git worktree of `revision`"""
+    toplevel = subprocess.run(['git', '-C', BOT_DIR, 'rev-parse', '--show-toplevel'],
+                              stdout=subprocess.PIPE, text=True, check=True).stdout.strip()
+    worktree = tempfile.mkdtemp(prefix='alienbot-bench-ref-')
+    subprocess.run(['git', '-C', toplevel, 'worktree', 'add', '--detach', worktree, revision],
+                   stdout=subprocess.DEVNULL, check=True)
+    try:
+        reference_dir = os.path.join(worktree, os.path.relpath(BOT_DIR, toplevel))
+        current, reference = [], []
+        for round_number in range(args.rounds):
+            print(f"Round {round_number + 1}/{args.rounds}...", file=sys.stderr)
+            reference.append(run_isolated(reference_dir, args))
+            current.append(run_isolated(BOT_DIR, args))
+    finally:
+        subprocess.run(['git', '-C', toplevel, 'worktree', 'remove', '--force', worktree], check=False)
+        shutil.rmtree(worktree, ignore_errors=True)
+    return median_results(current), median_results(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000, help='plain chat messages to replay')
+    parser.add_argument('--commands', type=int, default=500, help='!joke commands to replay')
+    parser.add_argument('--threads', type=int, default=200, help='forum threads to replay')
+    parser.add_argument('--batch', type=int, default=500, help='events fed between drains (default 500)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write results to {BASELINE_PATH}')
+    parser.add_argument('--compare', action='store_true', help='fail when results regress against the baseline')
+    parser.add_argument('--compare-ref', metavar='REV', help='fail when results regress against git revision REV')
+    parser.add_argument('--rounds', type=int, default=5, help='runs per side for --compare-ref (default 5)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression (default 0.25)')
+    parser.add_argument('--bot-dir', default=BOT_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare_ref:
+        results, reference = compare_with_revision(args.compare_ref, args)
+        print(json.dumps({'current': results, args.compare_ref: reference}, indent=2))
+        regressions = compare(results, reference, args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.compare_ref}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"No regressions against {args.compare_ref}")
+        return 0
+
+    # Keep all bot state (logs, SQLite stores, cursors) out of the source tree
+    workdir = tempfile.mkdtemp(prefix='alienbot-bench-')
+    os.environ.update({
+        'TOKEN': 'bench-token',
+        'LOG_LEVEL': 'WARNING',
+        'CHANNEL_ID': str(CHANNEL_ID),
+        'POST_CHANNEL_ID': str(FORUM_ID),
+        'HEALTH_PORT': '0',
+        'NOTIFY_COALESCE_WINDOW': '0.05',
+        'NOTIFIED_THREADS_DB': os.path.join(workdir, 'notified_threads.db'),
+        'FORUM_CURSOR_FILE': os.path.join(workdir, 'forum_cursor.json'),
+        'TREE_HASH_FILE': os.path.join(workdir, '.tree_sync_hash'),
+        'GUILD_CONFIG_DB': os.path.join(workdir, 'guild_config.db'),
+        # Measure dispatch itself, not admission control shedding the single bench user
+        'ADMISSION_USER_RATE': '1000000',
+        'ADMISSION_CHANNEL_RATE': '1000000',
+        'ADMISSION_GLOBAL_RATE': '1000000',
+    })
+    sys.path.insert(0, args.bot_dir)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = asyncio.run(run_benchmark(args.messages, args.commands, args.threads, args.batch))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if args.compare:
+        try:
+            with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"No baseline at {BASELINE_PATH}; run with --save-baseline first")
+            return 1
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -1,47 +1,70 @@
 import discord
 from discord.ext import commands
-import random
 import logging
+import os
+
+from utils.joke_corpus import DeckTable, JokeCorpus
 
 logger = logging.getLogger('AlienBot.jokes')
 
+# One joke per line; reload with !reload_jokes after editing
+JOKES_FILE = os.getenv("JOKES_FILE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jokes.txt"))
+
 class Jokes(commands.Cog):
+    # Intents this cog relies on (used by the lean BOT_PROFILE)
+    required_intents = ('guilds', 'guild_messages', 'message_content')
+
     def __init__(self, bot):
         self.bot = bot
-        self.last_joke = None  # Track the last joke told
-
-    def get_random_joke(self, jokes):
-        """Get a random joke that's different from the last one"""
-        if len(jokes) == 1:
-            return jokes[0]  # If only one joke, return it
-        
-        # Filter out the last joke
-        available_jokes = [joke for joke in jokes if joke != self.last_joke]
-        
-        # If all jokes were the same as last one (shouldn't happen with 5 jokes), use all jokes
-        if not available_jokes:
-            available_jokes = jokes
-        
-        return random.choice(available_jokes)
+        self.corpus = JokeCorpus(JOKES_FILE)
+        # Per guild/channel shuffled decks: no repeats until every joke has been told there
+        self.decks = DeckTable()
+
+    async def cog_load(self):
+        try:
+            await self.corpus.load()
+        except OSError as e:
+            logger.error(f"❌ Could not load jokes from {JOKES_FILE}: {e}")
+
+    async def cog_unload(self):
+        self.corpus.close()
+
+    def export_state(self):
+        """State carried across a hot reload"""
+        return {'decks': self.decks}
+
+    def import_state(self, state):
+        self.decks = state.get('decks', self.decks)
+
+    def get_random_joke(self, guild_id, channel_id):
+        """Next joke from this channel's deck, or None when the corpus is empty"""
+        if not len(self.corpus):
+            return None
+        return self.corpus[self.decks.draw((guild_id, channel_id), len(self.corpus), self.corpus.generation)]
 
     @commands.command(name='joke')
     async def tell_joke(self, ctx):
         """Tell a random joke about Mr. Piotr"""
         logger.info(f"Joke command used by {ctx.author} in {ctx.guild.name if ctx.guild else 'DM'}")
-        jokes = [
-            "Why Mr. Piotr is always late on the lesson? Because he has to park his UFO and he can't find a parking spot big enough.",
-            "Why is The Nóż so useful? Because it can scare kids.",
-            "Why is Mr. Piotr stealing cows? Because their milk is expensive in the galaxy.",
-            "Why does Mr. Piotr have a human skin color? Because he doesn't want anybody to see his green skin.",
-            "Why does Mr. Piotr write with his PC pen? Because he can't see letters clearly with his alien eyes."
-        ]
-        
-        # Get a joke that's different from the last one
-        joke = self.get_random_joke(jokes)
-        self.last_joke = joke  # Update the last joke
-        
+        joke = self.get_random_joke(ctx.guild.id if ctx.guild else None, ctx.channel.id)
+        if joke is None:
+            await ctx.send("❌ No jokes loaded.")
+            return
+
         logger.debug(f"Selected joke: {joke}")
         await ctx.send(joke)
 
+    @commands.command(name='reload_jokes')
+    @commands.has_permissions(administrator=True)
+    async def reload_jokes(self, ctx):
+        """Reload the joke file"""
+        try:
+            count = await self.corpus.load()
+        except OSError as e:
+            logger.error(f"❌ Could not reload jokes from {JOKES_FILE}: {e}")
+            await ctx.send(f"❌ Could not reload jokes: {e}")
+            return
+        await ctx.send(f"✅ Loaded {count} joke(s)")
+
 async def setup(bot):
     await bot.add_cog(Jokes(bot))
\ No newline at end of file
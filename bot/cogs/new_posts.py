@@ -1,24 +1,105 @@
 import discord
 from discord.ext import commands
+import asyncio
 import logging
 import os
 from datetime import datetime
 
+from utils.backfill import ForumCursor, missed_threads
+from utils.dedupe import DedupeStore
+from utils.instrumentation import stats
+from utils.post_pipeline import ChannelCache, IdempotencyCache, send_idempotent
+from utils.starter_messages import StarterMessageResolver
+
 logger = logging.getLogger('AlienBot.new_posts')
 
+# Longest cog_unload waits for this instance's queued forum notifications to be delivered
+UNLOAD_DRAIN_TIMEOUT = float(os.getenv("UNLOAD_DRAIN_TIMEOUT", "10"))
+
+# Static parts of the !post embeds, built once and copied per post
+POST_TEMPLATE = discord.Embed(title="📝 New Post", color=0x00ff00)
+POST_NOTIFICATION_TEMPLATE = discord.Embed(title="🔔 New Post Created!", color=0xffa500)
+
+
+def post_embed(author, content):
+    embed = POST_TEMPLATE.copy()
+    embed.description = content
+    embed.timestamp = datetime.now()
+    embed.set_author(name=author.display_name, icon_url=author.avatar.url if author.avatar else None)
+    embed.set_footer(text=f"Posted by {author.name}")
+    return embed
+
+
+def post_notification_embed(author, content, post_channel_id, post_message):
+    embed = POST_NOTIFICATION_TEMPLATE.copy()
+    embed.description = f"**{author.display_name}** created a new post in <#{post_channel_id}>"
+    embed.timestamp = datetime.now()
+    embed.add_field(name="Post Content", value=content[:100] + "..." if len(content) > 100 else content, inline=False)
+    embed.add_field(name="Jump to Post", value=f"[Click here]({post_message.jump_url})", inline=False)
+    return embed
+
+
 class NewPosts(commands.Cog):
+    # Intents this cog relies on (used by the lean BOT_PROFILE)
+    required_intents = ('guilds', 'guild_messages', 'message_content')
+
     def __init__(self, bot):
         self.bot = bot
-        self.post_channel_id = os.getenv("POST_CHANNEL_ID")  # Channel to monitor for posts
-        self.notification_channel_id = os.getenv("CHANNEL_ID")  # Channel to send notifications
-        self.notified_threads = set()  # Track threads we've already notified about
+        # Post/notification channels come from bot.guild_config (per guild, env values as defaults)
+        # Track threads we've already notified about (bounded, persisted across restarts)
+        self.notified_threads = DedupeStore(os.getenv("NOTIFIED_THREADS_DB", "notified_threads.db"))
+        self.starter_messages = StarterMessageResolver()
+        self.forum_cursor = ForumCursor(os.getenv("FORUM_CURSOR_FILE", "forum_cursor.json"))
+        self._cursor_saver = None
+        # Threads with a notification being prepared or in flight, so a live event and a backfill never both notify
+        self._notifying = set()
+        # Dispatcher futures whose done-callbacks still update this instance's store and cursor
+        self._deliveries = set()
+        self.channels = ChannelCache(bot)
+        # Invoking message ID -> post message, so a repeated !post never posts twice
+        self.recent_posts = IdempotencyCache()
+
+    async def cog_load(self):
+        await self.notified_threads.load()
+        await self.forum_cursor.load()
+        self.bot.guild_config.add_listener(self.on_config_change)
+
+    async def cog_unload(self):
+        self.bot.guild_config.remove_listener(self.on_config_change)
+        # The dispatcher outlives a hot reload; let queued notifications mark this store before it closes
+        if self._deliveries:
+            await asyncio.wait(list(self._deliveries), timeout=UNLOAD_DRAIN_TIMEOUT)
+            if self._deliveries:
+                logger.warning(f"⚠️ {len(self._deliveries)} forum notification(s) still pending at unload; they may be sent again by the next backfill")
+        await self.notified_threads.close()
+        await self.forum_cursor.save()
+
+    def export_state(self):
+        """State carried across a hot reload (notified_threads is flushed to disk by cog_unload)"""
+        return {'recent_posts': self.recent_posts.export()}
+
+    def import_state(self, state):
+        self.recent_posts.restore(state.get('recent_posts', []))
+
+    def on_config_change(self, snapshot, defaults):
+        """Guild config listener: drop channels that may no longer be configured"""
+        self.channels.clear()
+
+    def channels_for(self, guild):
+        """GuildConfig (post_channel_id, notification_channel_id) in effect for a guild or DM"""
+        return self.bot.guild_config.for_guild(guild.id if guild else None)
 
     @commands.command(name='setup_posts')
+    @commands.check_any(commands.is_owner(), commands.has_permissions(administrator=True))
     async def setup_posts(self, ctx, post_channel_id: int, notification_channel_id: int):
         """Setup post monitoring channels"""
-        self.post_channel_id = post_channel_id
-        self.notification_channel_id = notification_channel_id
-        
+        if ctx.guild:
+            # Per-guild and shared with every worker process; the routing table is rebuilt from the store
+            await self.bot.guild_config.set(ctx.guild.id, post_channel_id, notification_channel_id)
+        else:
+            # Stored as the defaults row, shared by every worker process
+            await self.bot.guild_config.set_defaults(post_channel_id, notification_channel_id)
+
         logger.info(f"Post monitoring setup: Post channel {post_channel_id}, Notification channel {notification_channel_id}")
         await ctx.send(f"✅ **Post Monitoring Setup**\n"
                       f"📝 Post channel: <#{post_channel_id}>\n"
@@ -27,49 +108,40 @@ class NewPosts(commands.Cog):
     @commands.command(name='post')
     async def create_post(self, ctx, *, content):
         """Create a post in the designated post channel"""
-        if not self.post_channel_id:
+        post_channel_id, notification_channel_id = self.channels_for(ctx.guild)
+        if not post_channel_id:
             await ctx.send("❌ Post channel not configured. Use `!setup_posts` first.")
             return
         
         try:
-            post_channel = self.bot.get_channel(int(self.post_channel_id))
+            post_channel = self.channels.get(post_channel_id)
             if not post_channel:
                 await ctx.send("❌ Post channel not found.")
                 return
             
-            # Create embed for the post
-            embed = discord.Embed(
-                title="📝 New Post",
-                description=content,
-                color=0x00ff00,
-                timestamp=datetime.now()
+            # The invoking message ID is both the local idempotency key and the Discord nonce,
+            # so neither a re-dispatched command nor a retried send creates a second post
+            post_message, fresh = await self.recent_posts.run(
+                ctx.message.id,
+                lambda: send_idempotent(post_channel, ctx.message.id, embed=post_embed(ctx.author, content))
             )
-            embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar.url if ctx.author.avatar else None)
-            embed.set_footer(text=f"Posted by {ctx.author.name}")
+            if not fresh:
+                logger.info(f"Duplicate !post for message {ctx.message.id} ignored")
+                return
             
-            # Send post to designated channel
-            post_message = await post_channel.send(embed=embed)
-            
-            # Send notification to notification channel
-            if self.notification_channel_id:
-                notification_channel = self.bot.get_channel(int(self.notification_channel_id))
-                if notification_channel:
-                    notification_embed = discord.Embed(
-                        title="🔔 New Post Created!",
-                        description=f"**{ctx.author.display_name}** created a new post in <#{self.post_channel_id}>",
-                        color=0xffa500,
-                        timestamp=datetime.now()
-                    )
-                    notification_embed.add_field(name="Post Content", value=content[:100] + "..." if len(content) > 100 else content, inline=False)
-                    notification_embed.add_field(name="Jump to Post", value=f"[Click here]({post_message.jump_url})", inline=False)
-                    
-                    await notification_channel.send(embed=notification_embed)
+            # Queued on the dispatcher, so the notification goes out alongside the confirmation below
+            notification_channel = self.channels.get(notification_channel_id)
+            if notification_channel:
+                self.bot.notification_dispatcher.submit(
+                    notification_channel,
+                    post_notification_embed(ctx.author, content, post_channel_id, post_message)
+                )
             
             await ctx.send(f"✅ **Post created successfully!**\n"
-                          f"📝 Posted in: <#{self.post_channel_id}>\n"
+                          f"📝 Posted in: <#{post_channel_id}>\n"
                           f"🔗 [Jump to post]({post_message.jump_url})")
             
-            logger.info(f"Post created by {ctx.author} in channel {self.post_channel_id}")
+            logger.info(f"Post created by {ctx.author} in channel {post_channel_id}")
             
         except Exception as e:
             logger.error(f"Error creating post: {str(e)}")
@@ -78,27 +150,28 @@ class NewPosts(commands.Cog):
     @commands.command(name='post_status')
     async def post_status(self, ctx):
         """Check post monitoring status"""
+        post_channel_id, notification_channel_id = self.channels_for(ctx.guild)
         status_embed = discord.Embed(
             title="📊 Post Monitoring Status",
             color=0x0099ff,
             timestamp=datetime.now()
         )
         
-        if self.post_channel_id:
-            post_channel = self.bot.get_channel(int(self.post_channel_id))
+        if post_channel_id:
+            post_channel = self.channels.get(post_channel_id)
             status_embed.add_field(
                 name="📝 Post Channel", 
-                value=f"<#{self.post_channel_id}>" if post_channel else f"❌ Channel not found (ID: {self.post_channel_id})",
+                value=f"<#{post_channel_id}>" if post_channel else f"❌ Channel not found (ID: {post_channel_id})",
                 inline=False
             )
         else:
             status_embed.add_field(name="📝 Post Channel", value="❌ Not configured", inline=False)
         
-        if self.notification_channel_id:
-            notification_channel = self.bot.get_channel(int(self.notification_channel_id))
+        if notification_channel_id:
+            notification_channel = self.channels.get(notification_channel_id)
             status_embed.add_field(
                 name="🔔 Notification Channel", 
-                value=f"<#{self.notification_channel_id}>" if notification_channel else f"❌ Channel not found (ID: {self.notification_channel_id})",
+                value=f"<#{notification_channel_id}>" if notification_channel else f"❌ Channel not found (ID: {notification_channel_id})",
                 inline=False
             )
         else:
@@ -107,33 +180,124 @@ class NewPosts(commands.Cog):
         await ctx.send(embed=status_embed)
 
     @commands.Cog.listener()
+    async def on_message(self, message):
+        """Hand gateway messages to threads waiting for their starter message"""
+        self.starter_messages.feed(message)
+
+    @commands.Cog.listener()
+    @stats.timed('NewPosts.on_thread_create')
     async def on_thread_create(self, thread):
         """Detect when a new forum post (thread) is created"""
+        post_channel_id, _ = self.channels_for(thread.guild)
         # Check if thread is in the monitored channel
-        if not self.post_channel_id or str(thread.parent_id) != str(self.post_channel_id):
+        if not post_channel_id or thread.parent_id != post_channel_id:
             return
         
         # Check if we've already notified about this thread
         if thread.id in self.notified_threads:
             return
         
+        sent = await self.notify_thread(thread)
+        if sent is not None:
+            self._track_delivery(sent, thread.parent_id, thread.id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Catch up on forum posts created while the bot was offline or disconnected"""
+        # Channel objects are rebuilt on reconnect
+        self.channels.clear()
+        await self.backfill_forum()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.channels.invalidate(channel.id)
+
+    async def backfill_forum(self):
+        """Notify about threads newer than the stored cursor that were never notified"""
+        for post_channel_id in self.bot.guild_config.post_channel_ids():
+            try:
+                forum = self.channels.get(post_channel_id)
+                if not isinstance(forum, discord.ForumChannel):
+                    continue
+                
+                cursor_id = self.forum_cursor.get(forum.id)
+                if cursor_id is None:
+                    # First run: start from now instead of notifying the whole forum history
+                    self.forum_cursor.advance(forum.id, discord.utils.time_snowflake(discord.utils.utcnow()))
+                    await self.forum_cursor.save()
+                    logger.info(f"Forum cursor initialised for channel {forum.id}")
+                    continue
+                
+                threads = await missed_threads(forum, cursor_id)
+                # Threads whose failed notification is held but that no longer exist stop holding the cursor
+                self.forum_cursor.retain(forum.id, {thread.id for thread in threads} | self._notifying)
+                sent = 0
+                for thread in threads:
+                    if thread.id in self.notified_threads:
+                        self.forum_cursor.release(forum.id, thread.id)
+                        continue
+                    future = await self.notify_thread(thread, wait_for_gateway=False)
+                    if future is not None:
+                        self._track_delivery(future, forum.id, thread.id)
+                        sent += 1
+                await self.forum_cursor.save()
+                
+                logger.info(f"Forum backfill for channel {forum.id}: {len(threads)} new thread(s), {sent} notification(s) queued")
+            
+            except Exception as e:
+                logger.error(f"Error during forum backfill for channel {post_channel_id}: {str(e)}")
+
+    def _track_delivery(self, future, forum_id, thread_id):
+        """Hold the forum cursor behind a queued notification until it is delivered"""
+        self.forum_cursor.hold(forum_id, thread_id)
+        future.add_done_callback(lambda f: self._advance_cursor(f, forum_id, thread_id))
+
+    def _advance_cursor(self, future, forum_id, thread_id):
+        """Done-callback for a notification: a failed one keeps holding the cursor so backfill finds it again"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.forum_cursor.release(forum_id, thread_id)
+        if self._cursor_saver is None or self._cursor_saver.done():
+            self._cursor_saver = asyncio.get_running_loop().create_task(self._save_cursor())
+
+    async def _save_cursor(self):
+        # Deliveries may advance the cursor again while a save is running
+        while self.forum_cursor.dirty:
+            if not await self.forum_cursor.save():
+                break
+
+    def _mark_notified(self, future, thread_id):
+        self._notifying.discard(thread_id)
+        if not future.cancelled() and future.exception() is None:
+            self.notified_threads.add(thread_id)
+
+    async def notify_thread(self, thread, wait_for_gateway=True):
+        """Queue a notification about a forum post; returns the delivery future, or None if nothing was queued.
+
+        The thread is only marked as notified once the message was actually sent.
+        The dispatcher does not retry a failed send; the caller holds the forum
+        cursor behind the thread (see _track_delivery), so the backfill on the
+        next ready/reconnect picks it up again.
+        """
+        # Reserve the thread before awaiting anything; released once the send has finished either way
+        if thread.id in self.notified_threads or thread.id in self._notifying:
+            return None
+        self._notifying.add(thread.id)
+        
+        post_channel_id, notification_channel_id = self.channels_for(thread.guild)
         # Send notification about new forum post
         try:
-            if self.notification_channel_id:
-                notification_channel = self.bot.get_channel(int(self.notification_channel_id))
+            if notification_channel_id:
+                notification_channel = self.channels.get(notification_channel_id)
                 if notification_channel:
-                    # Get the first message in the thread to get content
-                    first_message = None
-                    try:
-                        async for message in thread.history(limit=1, oldest_first=True):
-                            first_message = message
-                            break
-                    except:
-                        pass
+                    # Get the first message in the thread (cache/gateway first, REST only as a fallback)
+                    first_message = await self.starter_messages.resolve(thread, wait_for_gateway=wait_for_gateway)
+                    # Without a member cache (lean profile) thread.owner is None; the starter message carries the author
+                    owner = thread.owner or (first_message.author if first_message else None)
                     
                     notification_embed = discord.Embed(
                         title="📋 New Forum Post Created!",
-                        description=f"**{thread.owner.display_name if thread.owner else 'Unknown'}** created a new forum post in <#{self.post_channel_id}>",
+                        description=f"**{owner.display_name if owner else 'Unknown'}** created a new forum post in <#{post_channel_id}>",
                         color=0x9b59b6,
                         timestamp=datetime.now()
                     )
@@ -152,21 +316,26 @@ class NewPosts(commands.Cog):
                     notification_embed.add_field(name="Thread", value=f"[Click here]({thread.jump_url})", inline=False)
                     
                     # Add author info
-                    if thread.owner:
+                    if owner:
                         notification_embed.set_author(
-                            name=thread.owner.display_name, 
-                            icon_url=thread.owner.avatar.url if thread.owner.avatar else None
+                            name=owner.display_name, 
+                            icon_url=owner.avatar.url if owner.avatar else None
                         )
                     
-                    await notification_channel.send(embed=notification_embed)
+                    future = self.bot.notification_dispatcher.submit(notification_channel, notification_embed)
                     
-                    # Mark this thread as notified
-                    self.notified_threads.add(thread.id)
+                    # Mark this thread as notified once the dispatcher has delivered it
+                    future.add_done_callback(lambda f: self._mark_notified(f, thread.id))
+                    self._deliveries.add(future)
+                    future.add_done_callback(self._deliveries.discard)
                     
-                    logger.info(f"Forum post notification sent for thread '{thread.name}' by {thread.owner} in channel {self.post_channel_id}")
+                    logger.info(f"Forum post notification queued for thread '{thread.name}' by {owner} in channel {post_channel_id}")
+                    return future
         
         except Exception as e:
             logger.error(f"Error sending forum post notification: {str(e)}")
+        self._notifying.discard(thread.id)
+        return None
 
 async def setup(bot):
     await bot.add_cog(NewPosts(bot))
\ No newline at end of file
@@ -0,0 +1,71 @@
+import discord
+from discord.ext import commands
+import io
+import json
+import logging
+from datetime import datetime
+
+from utils.instrumentation import stats
+from utils.profiler import profiler
+
+logger = logging.getLogger('AlienBot.stats')
+
+
+def _ms(value):
+    """Format seconds as milliseconds for display"""
+    return "—" if value is None else f"{value * 1000:.1f}ms"
+
+
+def _format_table(table):
+    """One line per series: name, count, p50/p95/p99"""
+    lines = []
+    for name, series in sorted(table.items()):
+        summary = series.summary()
+        lines.append(f"`{name}` ×{summary['count']}: {_ms(summary['p50'])} / {_ms(summary['p95'])} / {_ms(summary['p99'])}")
+    return "\n".join(lines)[:1024] or "No data yet"
+
+
+class Stats(commands.Cog):
+    # Intents this cog relies on (used by the lean BOT_PROFILE)
+    required_intents = ('guilds', 'guild_messages', 'message_content')
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name='stats')
+    async def show_stats(self, ctx, output: str = None):
+        """Show latency stats (use `!stats json` for a machine-readable dump)"""
+        if output == "json":
+            dump = json.dumps(stats.snapshot(), indent=2)
+            await ctx.send(file=discord.File(io.BytesIO(dump.encode('utf-8')), filename="stats.json"))
+            return
+
+        lag = stats.loop_lag.summary()
+        embed = discord.Embed(
+            title="📈 Bot Stats (p50 / p95 / p99)",
+            color=0x0099ff,
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="💓 Gateway Heartbeat", value=_ms(stats.heartbeat_latency()), inline=True)
+        embed.add_field(name="⏱️ Event Loop Lag", value=f"{_ms(lag['p50'])} / {_ms(lag['p95'])} / {_ms(lag['p99'])}", inline=True)
+        embed.add_field(name="⚙️ Commands", value=_format_table(stats.commands), inline=False)
+        embed.add_field(name="👂 Listeners", value=_format_table(stats.listeners), inline=False)
+        embed.add_field(name=f"🌐 Discord REST (errors: {stats.rest_errors})", value=_format_table(stats.rest), inline=False)
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name='profile')
+    @commands.has_permissions(administrator=True)
+    async def profile(self, ctx, seconds: float = 10.0):
+        """Sample every thread for a few seconds and upload a collapsed-stack flamegraph file"""
+        await ctx.send(f"🔬 Profiling for {min(seconds, 60):.0f}s...")
+        try:
+            path, samples = await profiler.profile(seconds)
+        except RuntimeError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        await ctx.send(f"✅ {samples} samples (open with flamegraph.pl or speedscope.app)",
+                       file=discord.File(path))
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
\ No newline at end of file
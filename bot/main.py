@@ -1,77 +1,136 @@
-import discord
+import asyncio
 from discord.ext import commands
 import os
 import logging
-from datetime import datetime
+import time
 from dotenv import load_dotenv
-from api.health import start_health_api
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Changed to DEBUG to see more details
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from api.health import start_health_api, register_metrics_provider
+from utils.logging_setup import add_handler, setup_logging
+from utils.routing import ChannelRouter
+from utils.admission import AdmissionController, DEFER, REJECT
+from utils.guild_config import GuildConfigStore, defaults_from_env
+from utils.instrumentation import stats
+from utils.tree_sync import sync_if_changed
+from utils.cog_reload import CogReloader, discover_cogs
+from utils.dispatcher import NotificationDispatcher, RateLimitTracker
+from utils.memory import cache_report
+from utils.profiles import client_options
+from utils.profiler import watchdog
+
+load_dotenv()
+
+# Configure logging (LOG_MODE=queue moves file/console writes off the event loop)
+setup_logging(os.getenv("LOG_FILE", "bot.log"))
 logger = logging.getLogger('AlienBot')
 
 # Create a separate logger for console output without emojis
 console_logger = logging.getLogger('AlienBot.Console')
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-console_logger.addHandler(console_handler)
+add_handler(console_logger, console_handler)
 console_logger.setLevel(logging.INFO)
+# The root logger already prints to the console; don't print these lines twice
+console_logger.propagate = False
 
-load_dotenv()
 TOKEN = os.getenv("TOKEN")
 PREFIX = os.getenv("INTERACT")
-CHANNEL_ID = os.getenv("CHANNEL_ID")
-POST_CHANNEL_ID = os.getenv("POST_CHANNEL_ID")
-
-intents = discord.Intents.default()
-# Enable these privileged intents - REQUIRED for bot to work in channels
-intents.message_content = True
-intents.members = True
+TREE_HASH_FILE = os.getenv("TREE_HASH_FILE", ".tree_sync_hash")
+NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", "1.0"))
+HOT_RELOAD = os.getenv("HOT_RELOAD", "").lower() in ("1", "true", "yes")
+# The command tree is global; with several worker processes only one of them (the supervisor's worker 0) syncs it
+SYNC_COMMAND_TREE = os.getenv("SYNC_COMMAND_TREE", "1").lower() in ("1", "true", "yes")
+# "lean" trims intents/caches to what the cogs declare (see utils/profiles.py)
+BOT_PROFILE = os.getenv("BOT_PROFILE", "default").lower()
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "200"))
+COGS_PATH = os.path.join(os.path.dirname(__file__), "cogs")
+GUILD_CONFIG_DB = os.getenv("GUILD_CONFIG_DB", "guild_config.db")
+# SHARD_MODE=auto runs AutoShardedBot in this process; the supervisor sets SHARD_IDS/SHARD_COUNT per worker
+SHARD_MODE = os.getenv("SHARD_MODE", "none").lower()
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()]
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
 
 # Function to check for ! prefix
 def get_prefix(bot, message):
     """Check for ! prefix"""
     return commands.when_mentioned_or("!")(bot, message)
 
-bot = commands.Bot(command_prefix=get_prefix, intents=intents)
+# One aiohttp trace feeds both REST timings and rate-limit bucket tracking
+http_trace = stats.trace_config()
+rate_limits = RateLimitTracker()
+rate_limits.attach(http_trace)
+
+bot_options = client_options(BOT_PROFILE, COGS_PATH, max_messages=MAX_MESSAGES)
+if SHARD_MODE == "auto" or SHARD_IDS:
+    bot_class = commands.AutoShardedBot
+    bot_options.update(shard_ids=SHARD_IDS or None, shard_count=SHARD_COUNT)
+else:
+    bot_class = commands.Bot
+
+bot = bot_class(command_prefix=get_prefix, http_trace=http_trace, **bot_options)
+bot.cogs_loaded = False
+bot.startup_logged = False
+
+# Per-command latency hooks, REST timings (via http_trace) and /metrics export
+stats.install(bot)
+register_metrics_provider(stats.prometheus_lines)
+register_metrics_provider(watchdog.prometheus_lines)
+
+# Coalescing, rate-limit-aware sender used by NewPosts for notifications
+bot.notification_dispatcher = NotificationDispatcher(rate_limits, window=NOTIFY_COALESCE_WINDOW)
+register_metrics_provider(bot.notification_dispatcher.prometheus_lines)
+
+# Token-bucket admission control in front of process_commands (server admins get a priority lane)
+admission = AdmissionController(
+    user_rate=float(os.getenv("ADMISSION_USER_RATE", "1.0")),
+    channel_rate=float(os.getenv("ADMISSION_CHANNEL_RATE", "5.0")),
+    global_rate=float(os.getenv("ADMISSION_GLOBAL_RATE", "20.0")),
+)
+register_metrics_provider(admission.prometheus_lines)
+
+# Per-guild channel config shared by every worker process through a local SQLite file;
+# CHANNEL_ID/POST_CHANNEL_ID are parsed once here and act as the defaults
+bot.guild_config = GuildConfigStore(GUILD_CONFIG_DB, defaults=defaults_from_env())
+
+# Channel allow-list is compiled once; per-guild overrides are swapped in whenever the config store changes
+channel_router = ChannelRouter.from_defaults(bot.guild_config.defaults)
+bot.channel_router = channel_router
+bot.guild_config.add_listener(channel_router.apply_guild_configs)
+
+# Prefixes a message must start with to possibly be a command ("!" or a bot mention)
+_command_prefixes = None
+
+def could_be_command(message):
+    """Cheap pre-filter so plain chat never reaches process_commands/get_prefix"""
+    global _command_prefixes
+    if _command_prefixes is None:
+        if bot.user is None:
+            return True
+        _command_prefixes = ("!", f"<@{bot.user.id}>", f"<@!{bot.user.id}>")
+    return message.content.startswith(_command_prefixes)
+
+def command_name(content):
+    """Name of the command a message invokes (text after the prefix), or None"""
+    for prefix in _command_prefixes or ("!",):
+        if content.startswith(prefix):
+            parts = content[len(prefix):].split(None, 1)
+            return parts[0] if parts else None
+    return None
+
+def is_privileged(author):
+    """Server admins and managers get the admission priority lane (never DMs or plain members)"""
+    permissions = getattr(author, 'guild_permissions', None)
+    return permissions is not None and (permissions.administrator or permissions.manage_guild)
 
 def should_respond_in_channel(channel):
     """Check if bot should respond in this channel"""
-    # Allow responses in the main bot channel
-    if not CHANNEL_ID or CHANNEL_ID.strip() == "":
-        return True  # No channel restriction, respond everywhere
-    
-    try:
-        target_channel_id = int(CHANNEL_ID)
-        if channel.id == target_channel_id:
-            return True
-    except (ValueError, TypeError):
-        logger.warning(f"Invalid CHANNEL_ID format: {CHANNEL_ID}")
-        return True  # If invalid, respond everywhere
-    
-    # Allow responses in forum post channels (for monitoring)
-    if POST_CHANNEL_ID:
-        try:
-            post_channel_id = int(POST_CHANNEL_ID)
-            if channel.id == post_channel_id:
-                return True
-        except (ValueError, TypeError):
-            pass
-    
-    return False  # Don't respond in other channels
+    guild_id = channel.guild.id if getattr(channel, "guild", None) else None
+    return channel_router.allows(guild_id, channel.id)
 
 async def load_cogs():
     """Load all cogs from the cogs directory"""
     logger.info("🤖 Starting to load cogs...")
     console_logger.info("Starting to load cogs...")
-    cogs_path = os.path.join(os.path.dirname(__file__), "cogs")
+    cogs_path = COGS_PATH
     
     if not os.path.exists(cogs_path):
         logger.error(f"❌ Cogs directory not found: {cogs_path}")
@@ -81,20 +140,27 @@ async def load_cogs():
     loaded_cogs = []
     failed_cogs = []
     
-    for filename in os.listdir(cogs_path):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            try:
-                await bot.load_extension(f"cogs.{filename[:-3]}")
-                loaded_cogs.append(filename[:-3])
-                logger.info(f"✅ Successfully loaded cog: {filename[:-3]}")
-                console_logger.info(f"Successfully loaded cog: {filename[:-3]}")
-            except Exception as e:
-                failed_cogs.append((filename[:-3], str(e)))
-                logger.error(f"❌ Failed to load cog {filename[:-3]}: {e}")
-                console_logger.error(f"Failed to load cog {filename[:-3]}: {e}")
+    async def load_cog(name):
+        started = time.perf_counter()
+        try:
+            await bot.load_extension(f"cogs.{name}")
+        except Exception as e:
+            failed_cogs.append((name, str(e)))
+            logger.error(f"❌ Failed to load cog {name}: {e}")
+            console_logger.error(f"Failed to load cog {name}: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        loaded_cogs.append(name)
+        logger.info(f"✅ Successfully loaded cog: {name} ({elapsed_ms:.1f}ms)")
+        console_logger.info(f"Successfully loaded cog: {name} ({elapsed_ms:.1f}ms)")
+    
+    # Load extensions concurrently so async cog_load work (e.g. opening stores) overlaps
+    started = time.perf_counter()
+    await asyncio.gather(*(load_cog(name) for name in discover_cogs(cogs_path)))
+    total_ms = (time.perf_counter() - started) * 1000
     
-    logger.info(f"🎯 Cog loading complete. Loaded: {len(loaded_cogs)}, Failed: {len(failed_cogs)}")
-    console_logger.info(f"Cog loading complete. Loaded: {len(loaded_cogs)}, Failed: {len(failed_cogs)}")
+    logger.info(f"🎯 Cog loading complete in {total_ms:.1f}ms. Loaded: {len(loaded_cogs)}, Failed: {len(failed_cogs)}")
+    console_logger.info(f"Cog loading complete in {total_ms:.1f}ms. Loaded: {len(loaded_cogs)}, Failed: {len(failed_cogs)}")
     if loaded_cogs:
         logger.info(f"📦 Loaded cogs: {', '.join(loaded_cogs)}")
         console_logger.info(f"Loaded cogs: {', '.join(loaded_cogs)}")
@@ -102,8 +168,44 @@ async def load_cogs():
         logger.error(f"💥 Failed cogs: {', '.join([f'{name}({error})' for name, error in failed_cogs])}")
         console_logger.error(f"Failed cogs: {', '.join([f'{name}({error})' for name, error in failed_cogs])}")
 
+async def setup_hook():
+    """Runs once before connecting to the gateway (never again on reconnect)"""
+    # Feeds the loop lag stats and logs the running task and stack whenever a callback
+    # blocks the loop past SLOW_CALLBACK_THRESHOLD
+    watchdog.start()
+    
+    try:
+        await bot.guild_config.open()
+        await load_cogs()
+        bot.cogs_loaded = True
+        if SYNC_COMMAND_TREE:
+            await sync_if_changed(bot, TREE_HASH_FILE)
+        
+        # Reload edited cogs in place instead of restarting (and re-identifying)
+        if HOT_RELOAD:
+            bot.cog_reloader = CogReloader(bot, COGS_PATH)
+            bot.cog_reloader.start()
+    except Exception as e:
+        logger.error(f"❌ Error during bot startup: {e}")
+        console_logger.error(f"Error during bot startup: {e}")
+    
+    # Health/metrics server lives on the bot's own loop; reconnects never re-bind the port
+    try:
+        await start_health_api(bot)
+    except OSError as e:
+        logger.error(f"❌ Failed to start health API: {e}")
+        console_logger.error(f"Failed to start health API: {e}")
+
+bot.setup_hook = setup_hook
+
 @bot.event
 async def on_ready():
+    # on_ready fires again after session re-identification; only log the banner once
+    if bot.startup_logged:
+        logger.info("🔄 Gateway session re-identified, cogs and command tree already set up")
+        return
+    bot.startup_logged = True
+    
     logger.info("=" * 50)
     logger.info("🤖 ALIEN BOT STARTING UP 🤖")
     logger.info("=" * 50)
@@ -112,9 +214,6 @@ async def on_ready():
     console_logger.info("=" * 50)
     
     try:
-        await load_cogs()
-        await bot.tree.sync()
-        
         logger.info(f"✅ Bot is ready! Logged in as {bot.user}")
         logger.info(f"📊 Bot ID: {bot.user.id}")
         logger.info(f"🏠 Connected to {len(bot.guilds)} guild(s)")
@@ -127,34 +226,34 @@ async def on_ready():
         logger.info(f"🔧 Bot prefix: ! (or @AlienBot mention)")
         console_logger.info(f"Bot prefix: ! (or @AlienBot mention)")
         
-        if CHANNEL_ID and CHANNEL_ID.strip():
-            try:
-                target_channel_id = int(CHANNEL_ID)
-                logger.info(f"🎯 Bot configured to respond in channel ID: {target_channel_id}")
-                console_logger.info(f"Bot configured to respond in channel ID: {target_channel_id}")
-            except (ValueError, TypeError):
-                logger.warning(f"⚠️ Invalid CHANNEL_ID format: {CHANNEL_ID}")
-                console_logger.warning(f"Invalid CHANNEL_ID format: {CHANNEL_ID}")
+        defaults = bot.guild_config.defaults
+        if defaults.notification_channel_id is not None:
+            logger.info(f"🎯 Bot configured to respond in channel ID: {defaults.notification_channel_id}")
+            console_logger.info(f"Bot configured to respond in channel ID: {defaults.notification_channel_id}")
         else:
             logger.info("🌐 Bot configured to respond in all channels")
             console_logger.info("Bot configured to respond in all channels")
         
-        if POST_CHANNEL_ID and POST_CHANNEL_ID.strip():
-            try:
-                post_channel_id = int(POST_CHANNEL_ID)
-                logger.info(f"📋 Bot monitoring forum posts in channel ID: {post_channel_id}")
-                console_logger.info(f"Bot monitoring forum posts in channel ID: {post_channel_id}")
-            except (ValueError, TypeError):
-                logger.warning(f"⚠️ Invalid POST_CHANNEL_ID format: {POST_CHANNEL_ID}")
-                console_logger.warning(f"Invalid POST_CHANNEL_ID format: {POST_CHANNEL_ID}")
+        if defaults.post_channel_id is not None:
+            logger.info(f"📋 Bot monitoring forum posts in channel ID: {defaults.post_channel_id}")
+            console_logger.info(f"Bot monitoring forum posts in channel ID: {defaults.post_channel_id}")
+        
+        configured = len(bot.guild_config.snapshot())
+        if configured:
+            logger.info(f"🗄️ {configured} guild(s) have their own channel configuration")
+            console_logger.info(f"{configured} guild(s) have their own channel configuration")
         
         if bot.guilds:
             guild_names = [guild.name for guild in bot.guilds]
             logger.info(f"🏰 Guild names: {', '.join(guild_names)}")
             console_logger.info(f"Guild names: {', '.join(guild_names)}")
         
-        # Start health API
-        start_health_api()
+        # Resident memory and cache sizes, to size how many guilds fit per process
+        report = cache_report(bot)
+        logger.info(f"🧠 Memory: {report['rss_mb']} MB RSS, {report['cached_messages']}/{report['max_messages']} cached messages, {report['cached_users']} cached users")
+        console_logger.info(f"Memory: {report['rss_mb']} MB RSS, {report['cached_messages']}/{report['max_messages']} cached messages, {report['cached_users']} cached users")
+        for guild in report['guilds']:
+            logger.info(f"🏰 {guild['name']} ({guild['id']}): {guild['cached_members']}/{guild['member_count']} members cached, {guild['channels']} channels, {guild['threads']} threads, {guild['roles']} roles")
         
         logger.info("🚀 Bot is now online and ready to receive commands!")
         logger.info("=" * 50)
@@ -176,23 +275,47 @@ async def on_command_error(ctx, error):
     logger.error(f"❌ Command error: {ctx.command.name} by {ctx.author} - {error}")
 
 @bot.event
+@stats.timed('on_message')
 async def on_message(message):
     """Log all messages and check channel restrictions"""
-    if message.author != bot.user:  # Don't log bot's own messages
-        logger.debug(f"💬 Message: {message.author} in {message.guild.name if message.guild else 'DM'}: {message.content[:100]}...")
+    # Guard debug logging so guild/channel lookups are skipped entirely when DEBUG is off
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug and message.author != bot.user:  # Don't log bot's own messages
+        logger.debug("💬 Message: %s in %s: %.100s...", message.author, message.guild.name if message.guild else 'DM', message.content)
     
     # Debug logging for channel filtering
     if message.guild:
-        logger.debug(f"🔍 Processing message in guild: {message.guild.name}, channel: {message.channel.name} (ID: {message.channel.id})")
+        if debug:
+            logger.debug("🔍 Processing message in guild: %s, channel: %s (ID: %s)", message.guild.name, message.channel.name, message.channel.id)
         
         # Check if bot should respond in this channel
         if not should_respond_in_channel(message.channel):
-            logger.debug(f"🚫 Ignoring message in channel {message.channel.name} (ID: {message.channel.id}) - not the target channel")
+            if debug:
+                logger.debug("🚫 Ignoring message in channel %s (ID: %s) - not the target channel", message.channel.name, message.channel.id)
             return
-        else:
-            logger.debug(f"✅ Channel {message.channel.name} is allowed - processing command")
-    else:
-        logger.debug(f"📱 Processing DM from {message.author}")
+        elif debug:
+            logger.debug("✅ Channel %s is allowed - processing command", message.channel.name)
+    elif debug:
+        logger.debug("📱 Processing DM from %s", message.author)
+    
+    # process_commands ignores bots (this one included); return before they can take admission tokens
+    if message.author.bot:
+        return
+    
+    # Skip command parsing for messages without a prefix or mention
+    if not could_be_command(message):
+        return
+    
+    # Admission control: shed or defer command floods before they reach the cogs
+    command = bot.all_commands.get(command_name(message.content))
+    if command is not None:
+        decision, wait = admission.admit(message.author.id, message.channel.id, is_privileged(message.author))
+        if decision == REJECT:
+            if debug:
+                logger.debug("🚦 Shed !%s from %s (would wait %.1fs)", command.name, message.author, wait)
+            return
+        if decision == DEFER:
+            await asyncio.sleep(wait)
     
     await bot.process_commands(message)
 
@@ -0,0 +1,146 @@
+"""Multi-process shard supervisor for AlienBot.
+
+Splits shards 0..SHARD_COUNT-1 across WORKERS processes. Each worker runs
+main.py as an AutoShardedBot with its own SHARD_IDS and HEALTH_PORT
+(HEALTH_PORT + worker index). Crashed workers are restarted with backoff.
+All workers share per-guild config through GUILD_CONFIG_DB; each one gets its
+own LOG_FILE and FORUM_CURSOR_FILE, and only worker 0 syncs the command tree.
+
+    WORKERS=4 python supervisor.py              # shard count recommended by Discord
+    WORKERS=2 SHARD_COUNT=8 python supervisor.py
+"""
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from utils.logging_setup import setup_logging
+
+load_dotenv()
+setup_logging('supervisor.log')
+logger = logging.getLogger('AlienBot.supervisor')
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_BACKOFF = 60.0
+# A worker that stayed up this long gets its restart backoff reset
+HEALTHY_UPTIME = 60.0
+
+
+async def recommended_shard_count(token):
+    """Shard count Discord recommends for this bot (GET /gateway/bot)"""
+    headers = {'Authorization': f'Bot {token}'}
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v10/gateway/bot', headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data['shards']
+
+
+def worker_path(path, index):
+    """Per-worker variant of a file path: worker_path('bot.log', 1) -> 'bot.worker1.log'"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{index}{ext}"
+
+
+def split_shards(shard_count, workers):
+    """Contiguous shard ranges, one per worker: split_shards(5, 2) -> [[0, 1, 2], [3, 4]]"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class Worker:
+    def __init__(self, index, shard_ids, shard_count, health_port):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.health_port = health_port
+        self.process = None
+        self.backoff = 1.0
+        self.started_at = None
+        self.restart_at = None  # monotonic deadline for restarting a crashed worker
+
+    def start(self):
+        env = dict(os.environ)
+        env.update({
+            'SHARD_MODE': 'auto',
+            'SHARD_IDS': ','.join(str(shard_id) for shard_id in self.shard_ids),
+            'SHARD_COUNT': str(self.shard_count),
+            'HEALTH_PORT': str(self.health_port),
+            # Files a single process rewrites wholesale must not be shared between workers
+            'LOG_FILE': worker_path(os.getenv("LOG_FILE", "bot.log"), self.index),
+            'FORUM_CURSOR_FILE': worker_path(os.getenv("FORUM_CURSOR_FILE", "forum_cursor.json"), self.index),
+            'SYNC_COMMAND_TREE': '1' if self.index == 0 else '0',
+        })
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        self.process = subprocess.Popen([sys.executable, os.path.join(BOT_DIR, 'main.py')], cwd=BOT_DIR, env=env)
+        logger.info(f"🚀 Worker {self.index} started (pid {self.process.pid}, shards {self.shard_ids}, health port {self.health_port})")
+
+
+async def supervise():
+    token = os.getenv("TOKEN")
+    workers = int(os.getenv("WORKERS", os.cpu_count() or 1))
+    shard_count = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else await recommended_shard_count(token)
+    base_port = int(os.getenv("HEALTH_PORT", 5000))
+
+    pool = [Worker(index, shard_ids, shard_count, base_port + index)
+            for index, shard_ids in enumerate(split_shards(shard_count, workers))]
+    logger.info(f"🧩 Running {shard_count} shard(s) across {len(pool)} worker process(es)")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass
+
+    for worker in pool:
+        worker.start()
+
+    while not stopping.is_set():
+        now = time.monotonic()
+        for worker in pool:
+            if worker.restart_at is not None:
+                # Waiting out the backoff without blocking the checks on the other workers or shutdown
+                if now >= worker.restart_at:
+                    worker.start()
+                continue
+            code = worker.process.poll()
+            if code is None:
+                continue
+            if now - worker.started_at > HEALTHY_UPTIME:
+                worker.backoff = 1.0
+            logger.error(f"💥 Worker {worker.index} exited with code {code}, restarting in {worker.backoff:.0f}s")
+            worker.restart_at = now + worker.backoff
+            worker.backoff = min(worker.backoff * 2, MAX_BACKOFF)
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+    logger.info("🛑 Stopping workers...")
+    for worker in pool:
+        if worker.process.poll() is None:
+            worker.process.terminate()
+    for worker in pool:
+        try:
+            worker.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.process.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(supervise())
\ No newline at end of file
@@ -0,0 +1,121 @@
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger('AlienBot.admission')
+
+ADMIT = 'admit'
+DEFER = 'defer'
+REJECT = 'reject'
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class BucketTable:
+    """Token buckets keyed by ID, capped at max_keys and evicting idle keys.
+
+    Keys are kept in least-recently-used order, so both the size cap and the
+    idle sweep only ever pop from the front: memory stays fixed and every
+    operation is amortised O(1). Tokens may go negative to hand out a
+    reservation; the debt is the time the caller has to wait.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, idle_ttl=600.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        self._buckets = OrderedDict()
+
+    def _sweep(self, now):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def take(self, key, now):
+        """Reserve one token; returns seconds until the reservation is covered"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            self._sweep(now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        bucket.tokens -= 1
+        return 0.0 if bucket.tokens >= 0 else -bucket.tokens / self.rate
+
+    def refund(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self.burst, bucket.tokens + 1)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Per-user, per-channel and global token buckets in front of process_commands.
+
+    A command is admitted when every bucket has a token, deferred when the
+    longest wait is at most max_defer seconds, and rejected (shed) otherwise.
+    Privileged authors (server admins/managers, decided by the caller) skip
+    the shared buckets and only go through a small per-user bucket of their
+    own, so moderation still gets through while the normal lanes are saturated.
+    """
+
+    def __init__(self, user_rate=1.0, user_burst=5, channel_rate=5.0, channel_burst=10,
+                 global_rate=20.0, global_burst=40, max_defer=3.0,
+                 priority_rate=1.0, priority_burst=5):
+        self.users = BucketTable(user_rate, user_burst)
+        self.channels = BucketTable(channel_rate, channel_burst)
+        self.global_bucket = BucketTable(global_rate, global_burst, max_keys=1)
+        self.priority = BucketTable(priority_rate, priority_burst)
+        self.max_defer = max_defer
+        self.counters = {'admitted': 0, 'deferred': 0, 'priority': 0,
+                         'shed_user': 0, 'shed_channel': 0, 'shed_global': 0, 'shed_priority': 0}
+
+    def admit(self, user_id, channel_id, privileged=False):
+        """Returns (decision, wait_seconds) for one command invocation"""
+        now = time.monotonic()
+
+        if privileged:
+            wait = self.priority.take(user_id, now)
+            if wait > self.max_defer:
+                self.priority.refund(user_id)
+                self.counters['shed_priority'] += 1
+                return REJECT, wait
+            self.counters['priority'] += 1
+            return (DEFER, wait) if wait else (ADMIT, 0.0)
+
+        lanes = (('user', self.users, user_id), ('channel', self.channels, channel_id),
+                 ('global', self.global_bucket, None))
+        waits = [(table.take(key, now), name) for name, table, key in lanes]
+        wait, lane = max(waits)
+        if wait > self.max_defer:
+            for _, table, key in lanes:
+                table.refund(key)
+            self.counters[f'shed_{lane}'] += 1
+            return REJECT, wait
+        if wait:
+            self.counters['deferred'] += 1
+            return DEFER, wait
+        self.counters['admitted'] += 1
+        return ADMIT, 0.0
+
+    def prometheus_lines(self):
+        lines = ['# TYPE alienbot_admission_total counter']
+        for name, value in self.counters.items():
+            lines.append(f'alienbot_admission_total{{result="{name}"}} {value}')
+        lines.append('# TYPE alienbot_admission_tracked_keys gauge')
+        lines.append(f'alienbot_admission_tracked_keys{{table="user"}} {len(self.users)}')
+        lines.append(f'alienbot_admission_tracked_keys{{table="channel"}} {len(self.channels)}')
+        return lines
\ No newline at end of file
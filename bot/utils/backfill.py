@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger('AlienBot.backfill')
+
+
+class ForumCursor:
+    """Newest thread ID seen per forum channel, persisted to a small JSON file.
+
+    Threads whose notification is queued or failed are held: the cursor never
+    moves past the oldest held thread, so a backfill scanning from the cursor
+    finds it again. Holds live in memory only; the saved cursor is already
+    behind them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cursors = {}
+        # Newest thread ID the cursor would be at without holds
+        self._targets = {}
+        self._held = {}
+        self._dirty = False
+        self._save_lock = asyncio.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {int(key): int(value) for key, value in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"⚠️ Ignoring unreadable forum cursor file {self.path}: {e}")
+            return {}
+
+    def _write(self, cursors):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({str(key): value for key, value in cursors.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    async def load(self):
+        self._cursors = await asyncio.get_running_loop().run_in_executor(None, self._read)
+
+    @property
+    def dirty(self):
+        """Whether the cursors moved since the last successful save"""
+        return self._dirty
+
+    async def save(self):
+        """Persist the cursors if they moved since the last save; returns False if writing failed"""
+        # Serialised so concurrent saves never race on the temp file
+        async with self._save_lock:
+            if not self._dirty:
+                return True
+            self._dirty = False
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, dict(self._cursors))
+            except OSError as e:
+                self._dirty = True
+                logger.error(f"❌ Failed to save forum cursor to {self.path}: {e}")
+                return False
+            return True
+
+    def get(self, channel_id):
+        return self._cursors.get(channel_id)
+
+    def advance(self, channel_id, thread_id):
+        """Move the cursor forward (never backwards) to thread_id, but not past a held thread"""
+        target = max(thread_id, self._targets.get(channel_id, 0))
+        self._targets[channel_id] = target
+        held = self._held.get(channel_id)
+        if held:
+            target = min(target, min(held) - 1)
+        if target > self._cursors.get(channel_id, 0):
+            self._cursors[channel_id] = target
+            self._dirty = True
+
+    def hold(self, channel_id, thread_id):
+        """Keep the cursor behind thread_id until it is released"""
+        self._held.setdefault(channel_id, set()).add(thread_id)
+
+    def release(self, channel_id, thread_id):
+        """thread_id was delivered: drop its hold and advance to it"""
+        self._held.get(channel_id, set()).discard(thread_id)
+        self.advance(channel_id, thread_id)
+
+    def retain(self, channel_id, thread_ids):
+        """Drop holds on threads not in thread_ids (deleted since the notification failed)"""
+        held = self._held.get(channel_id)
+        if held and not held <= thread_ids:
+            held &= thread_ids
+            self.advance(channel_id, 0)
+
+
+async def missed_threads(forum, cursor_id):
+    """Threads in a forum created after cursor_id, oldest first.
+
+    Active threads come from the gateway cache. Archived threads are paged
+    newest-archived first and the scan stops at the first thread archived
+    before the cursor thread was created, since everything after it in the
+    listing was created even earlier. Cost scales with the threads missed,
+    not with the size of the forum.
+    """
+    cursor_time = discord.utils.snowflake_time(cursor_id)
+    found = {thread.id: thread for thread in forum.threads if thread.id > cursor_id}
+
+    async for thread in forum.archived_threads(limit=None):
+        if thread.archive_timestamp < cursor_time:
+            break
+        if thread.id > cursor_id:
+            found[thread.id] = thread
+
+    return [found[thread_id] for thread_id in sorted(found)]
\ No newline at end of file
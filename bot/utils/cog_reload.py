@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger('AlienBot.cog_reload')
+
+
+def discover_cogs(cogs_path):
+    """Extension names for every cog module in the cogs directory"""
+    return [filename[:-3] for filename in sorted(os.listdir(cogs_path))
+            if filename.endswith(".py") and not filename.startswith("__")]
+
+
+def _cogs_from_module(bot, extension):
+    return [cog for cog in bot.cogs.values() if type(cog).__module__ == extension]
+
+
+class CogReloader:
+    """Polls the cogs directory and hot-reloads changed extensions in place.
+
+    Cogs can implement export_state() -> dict and import_state(dict) to carry
+    runtime state (configured channels, caches, ...) across a reload. When a
+    reload fails, discord.py restores the previous module; the saved state is
+    re-applied to that restored cog as well.
+    """
+
+    def __init__(self, bot, cogs_path, interval=1.0):
+        self.bot = bot
+        self.cogs_path = cogs_path
+        self.interval = interval
+        self._mtimes = self._scan()
+        self._task = None
+
+    def _scan(self):
+        mtimes = {}
+        for name in discover_cogs(self.cogs_path):
+            try:
+                mtimes[name] = os.stat(os.path.join(self.cogs_path, f"{name}.py")).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+            logger.info(f"👀 Watching {self.cogs_path} for cog changes")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            current = self._scan()
+            for name, mtime in current.items():
+                previous = self._mtimes.get(name)
+                # One broken cog must not stop the watcher for the others
+                try:
+                    if previous is None:
+                        await self._load(name)
+                    elif previous != mtime:
+                        await self.reload(name)
+                except Exception as e:
+                    logger.error(f"❌ Error while reloading cog {name}: {e}")
+            for name in self._mtimes.keys() - current.keys():
+                await self._unload(name)
+            self._mtimes = current
+
+    def _compiles(self, name):
+        """Catch syntax errors before tearing down the running cog"""
+        path = os.path.join(self.cogs_path, f"{name}.py")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                compile(f.read(), path, 'exec')
+        except (OSError, SyntaxError) as e:
+            logger.error(f"❌ Not reloading cog {name}, source does not compile: {e}")
+            return False
+        return True
+
+    async def reload(self, name):
+        """Reload one cog, keeping its exported state. Returns True on success."""
+        extension = f"cogs.{name}"
+        if extension not in self.bot.extensions:
+            return await self._load(name)
+        if not self._compiles(name):
+            return False
+
+        saved = {cog.qualified_name: cog.export_state()
+                 for cog in _cogs_from_module(self.bot, extension) if hasattr(cog, 'export_state')}
+        try:
+            await self.bot.reload_extension(extension)
+            ok = True
+            logger.info(f"♻️ Reloaded cog: {name}")
+        except Exception as e:
+            ok = False
+            logger.error(f"❌ Failed to reload cog {name}, previous version restored: {e}")
+
+        for cog in _cogs_from_module(self.bot, extension):
+            state = saved.get(cog.qualified_name)
+            if state is not None and hasattr(cog, 'import_state'):
+                try:
+                    cog.import_state(state)
+                except Exception as e:
+                    ok = False
+                    logger.error(f"❌ Could not restore state of cog {cog.qualified_name}: {e}")
+        return ok
+
+    async def _load(self, name):
+        try:
+            await self.bot.load_extension(f"cogs.{name}")
+            logger.info(f"✅ Loaded new cog: {name}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to load new cog {name}: {e}")
+            return False
+
+    async def _unload(self, name):
+        try:
+            await self.bot.unload_extension(f"cogs.{name}")
+            logger.info(f"🗑️ Unloaded removed cog: {name}")
+        except Exception as e:
+            logger.error(f"❌ Failed to unload cog {name}: {e}")
\ No newline at end of file
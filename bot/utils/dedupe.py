@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('AlienBot.dedupe')
+
+
+class DedupeStore:
+    """Bounded "already seen" set backed by a local SQLite file.
+
+    Membership checks only touch the in-memory LRU/TTL front, so they are O(1)
+    and never wait on disk. New keys are queued and written in batches on a
+    dedicated single-thread executor; old rows are pruned past the TTL.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=7 * 24 * 3600, flush_interval=5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()  # key -> first-seen unix timestamp
+        self._pending = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dedupe')
+        self._conn = None
+        self._flush_task = None
+        self.loaded = False
+
+    # -- disk side (runs on the executor thread) -----------------------------
+
+    def _open_and_load(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (key INTEGER PRIMARY KEY, seen_at REAL NOT NULL)")
+        cutoff = time.time() - self.ttl
+        self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT key, seen_at FROM seen ORDER BY seen_at DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        return list(reversed(rows))
+
+    def _write_batch(self, batch):
+        self._conn.executemany("INSERT OR IGNORE INTO seen (key, seen_at) VALUES (?, ?)", batch)
+        self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.ttl,))
+        self._conn.commit()
+
+    # -- async API -----------------------------------------------------------
+
+    async def load(self):
+        """Open the store and warm the in-memory front (call once from cog_load)"""
+        if self.loaded:
+            return
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._executor, self._open_and_load)
+        for key, seen_at in rows:
+            self._entries.setdefault(key, seen_at)
+        self.loaded = True
+        self._flush_task = loop.create_task(self._flush_periodically())
+        logger.info(f"📂 Dedupe store {self.path} loaded with {len(rows)} entries")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write queued keys to disk in one transaction"""
+        if not self._pending or self._conn is None:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_batch, batch)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to persist {len(batch)} dedupe entries: {e}")
+            self._pending[:0] = batch
+
+    async def close(self):
+        """Flush outstanding writes and release the database"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+        self.loaded = False
+
+    # -- set-like API (in-memory only) ---------------------------------------
+
+    def __contains__(self, key):
+        seen_at = self._entries.get(key)
+        if seen_at is None:
+            return False
+        if time.time() - seen_at > self.ttl:
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key):
+        """Mark a key as seen; the disk write happens on the next batch flush"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        now = time.time()
+        self._entries[key] = now
+        self._pending.append((key, now))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
\ No newline at end of file
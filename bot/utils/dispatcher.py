@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import re
+import time
+
+from utils.instrumentation import LatencyHistogram, summary_lines
+
+logger = logging.getLogger('AlienBot.dispatcher')
+
+# Discord allows at most 10 embeds per message
+MAX_EMBEDS_PER_MESSAGE = 10
+
+_CHANNEL_MESSAGES_RE = re.compile(r'/channels/(\d+)/messages$')
+
+
+class RateLimitTracker:
+    """Latest X-RateLimit-* state per channel, read from Discord REST responses"""
+
+    def __init__(self):
+        self._buckets = {}  # channel_id -> (remaining, reset_at monotonic)
+
+    def attach(self, trace):
+        """Add the header hook to an existing aiohttp TraceConfig (the bot's http_trace)"""
+        async def on_request_end(session, context, params):
+            if params.method != 'POST':
+                return
+            match = _CHANNEL_MESSAGES_RE.search(params.url.path)
+            if match is None:
+                return
+            headers = params.response.headers
+            remaining = headers.get('X-RateLimit-Remaining')
+            reset_after = headers.get('X-RateLimit-Reset-After')
+            if remaining is None or reset_after is None:
+                return
+            try:
+                self._buckets[int(match.group(1))] = (int(remaining), time.monotonic() + float(reset_after))
+            except ValueError:
+                pass
+
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def delay_for(self, channel_id):
+        """Seconds to wait before the next send to this channel won't hit a 429"""
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            return 0.0
+        remaining, reset_at = bucket
+        if remaining > 0:
+            return 0.0
+        return max(0.0, reset_at - time.monotonic())
+
+    def consume(self, channel_id):
+        """Account for a send we are about to make before its response arrives"""
+        bucket = self._buckets.get(channel_id)
+        if bucket is not None and bucket[0] > 0:
+            self._buckets[channel_id] = (bucket[0] - 1, bucket[1])
+
+
+class NotificationDispatcher:
+    """Per-channel notification queues with coalescing and rate-limit pacing.
+
+    Each notification channel gets one worker task. Embeds that arrive within
+    `window` seconds of each other are merged into a single message of up to
+    10 embeds, and the worker sleeps out an exhausted rate-limit bucket
+    instead of letting the send run into a 429.
+    """
+
+    def __init__(self, rate_limits, window=1.0, idle_timeout=60.0):
+        self.rate_limits = rate_limits
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self._queues = {}
+        self._workers = {}
+        self.send_latency = LatencyHistogram()
+        self.messages_sent = 0
+        self.embeds_sent = 0
+        self.send_errors = 0
+
+    def submit(self, channel, embed):
+        """Queue an embed for a channel; returns a future resolving to the sent message"""
+        future = asyncio.get_running_loop().create_future()
+        # Callers may fire and forget; retrieve failures so they are not reported as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = asyncio.Queue()
+        queue.put_nowait((embed, future, time.perf_counter()))
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.get_running_loop().create_task(self._run(channel, queue))
+        return future
+
+    async def _collect(self, queue):
+        """Wait for one item, then merge whatever else arrives within the window"""
+        getter = asyncio.ensure_future(queue.get())
+        done, _ = await asyncio.wait({getter}, timeout=self.idle_timeout)
+        if getter not in done:
+            getter.cancel()
+            raise asyncio.TimeoutError
+        batch = [getter.result()]
+        # A full batch is already waiting during bursts; only hold the window open otherwise
+        if self.window > 0 and queue.qsize() < MAX_EMBEDS_PER_MESSAGE - 1:
+            await asyncio.sleep(self.window)
+        while len(batch) < MAX_EMBEDS_PER_MESSAGE and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _run(self, channel, queue):
+        while True:
+            try:
+                batch = await self._collect(queue)
+            except asyncio.TimeoutError:
+                # Idle: retire the worker; submit() starts a new one on demand
+                if queue.empty():
+                    del self._workers[channel.id]
+                    del self._queues[channel.id]
+                    return
+                continue
+
+            delay = self.rate_limits.delay_for(channel.id)
+            if delay:
+                logger.debug("⏳ Pacing notifications to %s for %.2fs (rate limit bucket empty)", channel.id, delay)
+                await asyncio.sleep(delay)
+
+            self.rate_limits.consume(channel.id)
+            try:
+                message = await channel.send(embeds=[embed for embed, _, _ in batch])
+            except Exception as e:
+                self.send_errors += 1
+                logger.error(f"❌ Failed to send {len(batch)} notification(s) to channel {channel.id}: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.messages_sent += 1
+            self.embeds_sent += len(batch)
+            for _, future, queued_at in batch:
+                self.send_latency.record(now - queued_at)
+                if not future.done():
+                    future.set_result(message)
+
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._queues.clear()
+
+    def prometheus_lines(self):
+        lines = [
+            '# TYPE alienbot_notify_queue_depth gauge',
+            f'alienbot_notify_queue_depth {self.queue_depth()}',
+            '# TYPE alienbot_notify_messages_sent_total counter',
+            f'alienbot_notify_messages_sent_total {self.messages_sent}',
+            '# TYPE alienbot_notify_embeds_sent_total counter',
+            f'alienbot_notify_embeds_sent_total {self.embeds_sent}',
+            '# TYPE alienbot_notify_send_errors_total counter',
+            f'alienbot_notify_send_errors_total {self.send_errors}',
+            '# TYPE alienbot_notify_latency_seconds summary',
+        ]
+        lines.extend(summary_lines('alienbot_notify_latency_seconds', '', self.send_latency))
+        return lines
\ No newline at end of file
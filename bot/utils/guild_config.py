@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger('AlienBot.guild_config')
+
+# Store row holding the defaults set with !setup_posts in a DM (no real guild has ID 0)
+DEFAULTS_ROW = 0
+
+
+class GuildConfig(NamedTuple):
+    """Channels configured for one guild, with IDs already parsed to int"""
+    post_channel_id: Optional[int] = None
+    notification_channel_id: Optional[int] = None
+
+
+def _parse_channel_id(name, value):
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        logger.warning(f"⚠️ Invalid {name} format: {value}")
+        return None
+
+
+def defaults_from_env():
+    """Fallback config for unconfigured guilds and DMs, from POST_CHANNEL_ID/CHANNEL_ID"""
+    return GuildConfig(
+        post_channel_id=_parse_channel_id("POST_CHANNEL_ID", os.getenv("POST_CHANNEL_ID")),
+        notification_channel_id=_parse_channel_id("CHANNEL_ID", os.getenv("CHANNEL_ID")),
+    )
+
+
+class GuildConfigStore:
+    """Per-guild post/notification channels in a local SQLite file shared by all worker processes.
+
+    Reads come from an immutable snapshot (a read-only mapping of guild ID to
+    GuildConfig) that is replaced with a single assignment on every change,
+    so readers never see a half-applied update. Writes go to SQLite on a
+    dedicated executor thread. Changes committed by other processes are
+    picked up by polling `PRAGMA data_version`, which only moves when another
+    connection commits, and registered listeners are called with the new
+    snapshot and defaults so dependent caches can rebuild instead of polling.
+
+    The defaults start out as the env values and are replaced by the
+    DEFAULTS_ROW row once one has been stored, so they are shared by every
+    worker and survive restarts like any guild's config.
+    """
+
+    def __init__(self, path, defaults=None, poll_interval=2.0):
+        self.path = path
+        self.env_defaults = defaults or GuildConfig()
+        self.defaults = self.env_defaults
+        self.poll_interval = poll_interval
+        self.loaded = False
+        self._rows = {}
+        self._snapshot = MappingProxyType({})
+        self._listeners = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='guild-config')
+        self._conn = None
+        self._data_version = None
+        self._poll_task = None
+
+    # -- disk side (runs on the executor thread) -----------------------------
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS guild_config ("
+            "guild_id INTEGER PRIMARY KEY, post_channel_id INTEGER, "
+            "notification_channel_id INTEGER, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        return self._read_all()
+
+    def _read_all(self):
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        rows = self._conn.execute(
+            "SELECT guild_id, post_channel_id, notification_channel_id FROM guild_config"
+        ).fetchall()
+        return {guild_id: GuildConfig(post_id, notify_id) for guild_id, post_id, notify_id in rows}
+
+    def _read_if_changed(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return None
+        return self._read_all()
+
+    def _write(self, guild_id, post_channel_id, notification_channel_id):
+        self._conn.execute(
+            "INSERT INTO guild_config (guild_id, post_channel_id, notification_channel_id, updated_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(guild_id) DO UPDATE SET "
+            "post_channel_id=excluded.post_channel_id, "
+            "notification_channel_id=excluded.notification_channel_id, updated_at=excluded.updated_at",
+            (guild_id, post_channel_id, notification_channel_id, time.time()),
+        )
+        self._conn.commit()
+
+    # -- async API -----------------------------------------------------------
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        """Load every guild's config and start watching for changes from other processes"""
+        configs = await self._run(self._open)
+        self.loaded = True
+        self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+        logger.info(f"🗄️ Guild config store {self.path} loaded ({len(configs)} guild(s))")
+        self._swap(configs)
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                configs = await self._run(self._read_if_changed)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Failed to poll guild config store: {e}")
+                continue
+            if configs is not None and configs != self._rows:
+                logger.info(f"🔄 Guild config changed on disk, {len(configs)} row(s) configured")
+                self._swap(configs)
+
+    async def set(self, guild_id, post_channel_id, notification_channel_id):
+        """Persist one guild's channels and apply them locally straight away"""
+        await self._run(self._write, guild_id, post_channel_id, notification_channel_id)
+        configs = dict(self._rows)
+        configs[guild_id] = GuildConfig(post_channel_id, notification_channel_id)
+        self._swap(configs)
+
+    async def set_defaults(self, post_channel_id, notification_channel_id):
+        """Persist the fallback config used by unconfigured guilds and DMs, overriding the env values"""
+        await self.set(DEFAULTS_ROW, post_channel_id, notification_channel_id)
+
+    def _swap(self, rows):
+        self._rows = rows
+        configs = dict(rows)
+        self.defaults = configs.pop(DEFAULTS_ROW, self.env_defaults)
+        self._snapshot = MappingProxyType(configs)
+        self._notify()
+
+    # -- typed accessors -----------------------------------------------------
+
+    def get(self, guild_id):
+        """Stored GuildConfig for a guild, or None when it only has the defaults"""
+        return self._snapshot.get(guild_id)
+
+    def for_guild(self, guild_id):
+        """GuildConfig in effect for a guild (None for DMs): stored config first, then the defaults"""
+        return self._snapshot.get(guild_id, self.defaults)
+
+    def post_channel_ids(self):
+        """Every configured post channel ID, defaults included"""
+        channel_ids = {config.post_channel_id for config in self._snapshot.values()}
+        channel_ids.add(self.defaults.post_channel_id)
+        channel_ids.discard(None)
+        return channel_ids
+
+    def snapshot(self):
+        """Read-only {guild_id: GuildConfig} mapping; never mutated, replaced on change"""
+        return self._snapshot
+
+    # -- change notification -------------------------------------------------
+
+    def add_listener(self, callback):
+        """callback(snapshot, defaults) runs on every change, including local writes and new defaults"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback(self._snapshot, self.defaults)
+            except Exception as e:
+                logger.error(f"❌ Guild config listener {callback!r} failed: {e}")
\ No newline at end of file
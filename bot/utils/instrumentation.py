@@ -0,0 +1,204 @@
+import aiohttp
+import functools
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger('AlienBot.instrumentation')
+
+# Number of recent samples kept per series; percentiles are computed over this window
+SAMPLE_WINDOW = 1024
+
+# Path segments after /webhooks/{id}/ and /interactions/{id}/ carry secrets
+_TOKEN_SCOPES = ('webhooks', 'interactions')
+
+
+def route_label(method, url):
+    """Bounded, secret-free label for a Discord REST call, or None for non-API URLs (gateway, CDN).
+
+    Numeric segments become {id}, reaction emoji become {emoji}, and every
+    non-numeric segment after a webhook/interaction ID becomes {token}, so
+    the number of labels is fixed by the API surface rather than by traffic.
+    """
+    path = url.path
+    if not path.startswith('/api/'):
+        return None
+    segments = path.split('/')
+    for index, segment in enumerate(segments):
+        if segment.isdigit():
+            segments[index] = '{id}'
+        elif index and segments[index - 1] == 'reactions':
+            segments[index] = '{emoji}'
+    for scope in _TOKEN_SCOPES:
+        if scope in segments:
+            start = segments.index(scope) + 2
+            segments[start:] = [segment if segment == '{id}' else '{token}' for segment in segments[start:]]
+    return f"{method} {'/'.join(segments)}"
+
+
+class LatencyHistogram:
+    """Fixed-size window of latency samples plus lifetime count/sum.
+
+    Recording is an append to a bounded deque; percentiles are only computed
+    when somebody reads them.
+    """
+
+    __slots__ = ('samples', 'count', 'total', 'max')
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, *quantiles):
+        """Nearest-rank percentiles over the current window (None when empty)"""
+        if not self.samples:
+            return [None for _ in quantiles]
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return [ordered[min(last, int(q * len(ordered)))] for q in quantiles]
+
+    def summary(self):
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'max': round(self.max, 6),
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+        }
+
+
+class Instrumentation:
+    """In-memory latency/lag registry shared by main.py, the cogs and the health API"""
+
+    def __init__(self):
+        self.commands = {}
+        self.listeners = {}
+        self.rest = {}
+        self.rest_errors = 0
+        # Fed by the loop watchdog's heartbeat (utils/profiler.py)
+        self.loop_lag = LatencyHistogram()
+        self.bot = None
+
+    def _series(self, table, name):
+        series = table.get(name)
+        if series is None:
+            series = table[name] = LatencyHistogram()
+        return series
+
+    # -- command hooks -------------------------------------------------------
+
+    async def before_invoke(self, ctx):
+        ctx._started_at = time.perf_counter()
+
+    async def after_invoke(self, ctx):
+        started = getattr(ctx, '_started_at', None)
+        if started is not None and ctx.command is not None:
+            self._series(self.commands, ctx.command.qualified_name).record(time.perf_counter() - started)
+
+    def install(self, bot):
+        """Attach global before/after invoke hooks to the bot"""
+        self.bot = bot
+        bot.before_invoke(self.before_invoke)
+        bot.after_invoke(self.after_invoke)
+
+    # -- listeners -----------------------------------------------------------
+
+    def timed(self, name):
+        """Decorator recording how long a listener coroutine takes"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._series(self.listeners, name).record(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    # -- Discord REST --------------------------------------------------------
+
+    def trace_config(self):
+        """aiohttp TraceConfig that times every Discord REST call (pass as http_trace=)"""
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.started_at = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            route = route_label(params.method, params.url)
+            if route is not None:
+                self._series(self.rest, route).record(time.perf_counter() - context.started_at)
+
+        async def on_request_exception(session, context, params):
+            if route_label(params.method, params.url) is not None:
+                self.rest_errors += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    # -- reading -------------------------------------------------------------
+
+    def heartbeat_latency(self):
+        latency = self.bot.latency if self.bot is not None else None
+        if latency is None or math.isinf(latency) or math.isnan(latency):
+            return None
+        return latency
+
+    def snapshot(self):
+        """Machine-readable dump of everything recorded so far"""
+        return {
+            'commands': {name: series.summary() for name, series in self.commands.items()},
+            'listeners': {name: series.summary() for name, series in self.listeners.items()},
+            'rest': {name: series.summary() for name, series in self.rest.items()},
+            'rest_errors': self.rest_errors,
+            'loop_lag': self.loop_lag.summary(),
+            'heartbeat_latency': self.heartbeat_latency(),
+        }
+
+    def prometheus_lines(self):
+        """Prometheus summary lines for the health API /metrics endpoint"""
+        lines = []
+        for metric, label, table in (
+            ('alienbot_command_latency_seconds', 'command', self.commands),
+            ('alienbot_listener_latency_seconds', 'listener', self.listeners),
+            ('alienbot_rest_latency_seconds', 'route', self.rest),
+        ):
+            lines.append(f'# TYPE {metric} summary')
+            for name, series in table.items():
+                lines.extend(summary_lines(metric, f'{label}="{name}",', series))
+        lines.append('# TYPE alienbot_rest_errors_total counter')
+        lines.append(f'alienbot_rest_errors_total {self.rest_errors}')
+        lines.append('# TYPE alienbot_loop_lag_seconds summary')
+        lines.extend(summary_lines('alienbot_loop_lag_seconds', '', self.loop_lag))
+        return lines
+
+
+def summary_lines(metric, labels, series):
+    """Prometheus summary lines (p50/p95/p99, _count, _sum) for one histogram"""
+    lines = []
+    for quantile, value in zip(('0.5', '0.95', '0.99'), series.percentiles(0.5, 0.95, 0.99)):
+        if value is not None:
+            lines.append(f'{metric}{{{labels}quantile="{quantile}"}} {value:.6f}')
+    bare = f'{{{labels.rstrip(",")}}}' if labels else ''
+    lines.append(f'{metric}_count{bare} {series.count}')
+    lines.append(f'{metric}_sum{bare} {series.total:.6f}')
+    return lines
+
+
+# Process-wide registry
+stats = Instrumentation()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import random
+from array import array
+from collections import OrderedDict
+
+logger = logging.getLogger('AlienBot.joke_corpus')
+
+# Decks up to this size store a real shuffled permutation; bigger ones use a keyed Feistel permutation
+SHUFFLED_DECK_LIMIT = 256
+FEISTEL_ROUNDS = 4
+
+
+class JokeCorpus:
+    """Jokes stored one per line in a UTF-8 text file, read on demand.
+
+    Only the byte offset of each non-empty line is kept in memory (8 bytes
+    per joke), so large corpora cost little RAM; a lookup is one seek and
+    one readline on a file handle kept open between calls. `generation`
+    goes up on every load, since indexes may then point at different jokes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self._offsets = array('Q')
+        self._file = None
+
+    def _index(self):
+        offsets = array('Q')
+        handle = open(self.path, 'rb')
+        position = 0
+        for line in handle:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+        return handle, offsets
+
+    async def load(self):
+        """(Re)build the offset index on a worker thread, then swap it in on the event loop"""
+        handle, offsets = await asyncio.to_thread(self._index)
+        previous, self._file, self._offsets = self._file, handle, offsets
+        self.generation += 1
+        if previous is not None:
+            previous.close()
+        logger.info(f"😂 Loaded {len(offsets)} joke(s) from {self.path}")
+        return len(offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        self._file.seek(self._offsets[index])
+        return self._file.readline().decode('utf-8').strip()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _mix(value):
+    """splitmix64 finalizer: every output bit depends on every input bit"""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+class Deck:
+    """A shuffled pass over range(size); a new shuffle is drawn per pass.
+
+    Small decks hold a Fisher-Yates permutation. Larger ones keep O(1) state:
+    card i is a 4-round Feistel network over the smallest even-bit domain
+    covering size, keyed per pass, with cycle-walking to stay below size.
+    The first card of a pass never repeats the last card of the previous one.
+    """
+
+    __slots__ = ('size', 'position', 'last', 'order', 'keys', 'half_bits')
+
+    def __init__(self, size):
+        self.size = size
+        self.last = None
+        self.order = None
+        self.keys = ()
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._shuffle()
+
+    def _shuffle(self):
+        self.position = 0
+        if self.size <= SHUFFLED_DECK_LIMIT:
+            self.order = array('I', range(self.size))
+            random.shuffle(self.order)
+            if self.size > 1 and self.order[0] == self.last:
+                swap = random.randrange(1, self.size)
+                self.order[0], self.order[swap] = self.order[swap], self.order[0]
+            return
+        self.keys = tuple(random.getrandbits(64) for _ in range(FEISTEL_ROUNDS))
+        while self._card(0) == self.last:
+            self.keys = tuple(random.getrandbits(64) for _ in range(FEISTEL_ROUNDS))
+
+    def _permute(self, value):
+        mask = (1 << self.half_bits) - 1
+        left, right = value >> self.half_bits, value & mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & mask)
+        return (left << self.half_bits) | right
+
+    def _card(self, position):
+        if self.order is not None:
+            return self.order[position]
+        # A permutation of the larger domain; walking it until a value lands in range permutes range(size)
+        value = self._permute(position)
+        while value >= self.size:
+            value = self._permute(value)
+        return value
+
+    def draw(self):
+        if self.position == self.size:
+            self._shuffle()
+        self.last = self._card(self.position)
+        self.position += 1
+        return self.last
+
+
+class DeckTable:
+    """One Deck per key, least-recently-used keys evicted past max_keys"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._decks = OrderedDict()
+
+    def draw(self, key, size, generation=0):
+        """Next index for key from a corpus of `size` entries; a deck is restarted when the corpus is reloaded"""
+        entry = self._decks.get(key)
+        if entry is None or entry[0] != generation or entry[1].size != size:
+            entry = self._decks[key] = (generation, Deck(size))
+        self._decks.move_to_end(key)
+        if len(self._decks) > self.max_keys:
+            self._decks.popitem(last=False)
+        return entry[1].draw()
+
+    def __len__(self):
+        return len(self._decks)
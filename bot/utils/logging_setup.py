@@ -0,0 +1,120 @@
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_queue_handler = None
+_listener = None
+# (listener, queue handler) pairs added by add_handler() in queue mode
+_extra_listeners = []
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped (and counted) when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _gzip_namer(name):
+    """Rotated files get a .gz suffix (bot.log.1.gz, bot.log.2.gz, ...)"""
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    """Compress the rotated log file and remove the uncompressed original"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _build_file_handler(path):
+    """Size-based rotating file handler that gzips old logs"""
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", 5 * 1024 * 1024)),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+        encoding='utf-8',
+        delay=True
+    )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(path='bot.log'):
+    """Configure the root logger.
+
+    LOG_MODE=sync (default) writes from the calling thread like before.
+    LOG_MODE=queue hands records to a bounded in-memory queue that a
+    background QueueListener thread drains, so the event loop never waits
+    on disk I/O. LOG_QUEUE_SIZE caps the queue; overflow is dropped and
+    counted (see dropped_records()).
+    """
+    global _queue_handler, _listener
+
+    level = getattr(logging, os.getenv("LOG_LEVEL", "DEBUG").upper(), logging.DEBUG)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = [_build_file_handler(path), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if os.getenv("LOG_MODE", "sync").lower() == "queue":
+        _queue_handler, _listener = _start_listener(handlers)
+        atexit.register(stop_logging)
+        root.addHandler(_queue_handler)
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+
+
+def _start_listener(handlers):
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return DroppingQueueHandler(log_queue), listener
+
+
+def add_handler(logger, handler):
+    """Attach a handler to one logger; with LOG_MODE=queue it also writes from the background thread"""
+    if _listener is None:
+        logger.addHandler(handler)
+        return
+    queue_handler, listener = _start_listener([handler])
+    _extra_listeners.append((listener, queue_handler))
+    logger.addHandler(queue_handler)
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer threads"""
+    global _listener
+    if _listener is not None:
+        for listener, _ in _extra_listeners:
+            listener.stop()
+        _listener.stop()
+        _listener = None
+        dropped = dropped_records()
+        if dropped:
+            print(f"⚠️ {dropped} log records were dropped (queue full)")
+
+
+def dropped_records():
+    """Number of log records dropped because the queue was full"""
+    handlers = [_queue_handler] + [queue_handler for _, queue_handler in _extra_listeners]
+    return sum(handler.dropped for handler in handlers if handler is not None)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cache_report(bot):
+    """Process RSS plus per-guild cache sizes, for the startup log"""
+    guilds = [
+        {
+            'id': guild.id,
+            'name': guild.name,
+            'member_count': guild.member_count,
+            'cached_members': len(guild.members),
+            'channels': len(guild.channels),
+            'threads': len(guild.threads),
+            'roles': len(guild.roles),
+        }
+        for guild in bot.guilds
+    ]
+    return {
+        'rss_mb': round(rss_bytes() / 2 ** 20, 1),
+        'cached_messages': len(bot.cached_messages),
+        'max_messages': bot._connection.max_messages,
+        'cached_users': len(bot.users),
+        'guilds': guilds,
+    }
\ No newline at end of file
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+import aiohttp
+import discord
+
+logger = logging.getLogger('AlienBot.post_pipeline')
+
+
+class ChannelCache:
+    """Channel objects keyed by ID, so hot paths skip get_channel lookups.
+
+    Only hits are cached; a missing channel is looked up again on the next
+    call. Entries are dropped with invalidate() when a channel is deleted and
+    cleared on reconnect, when discord.py rebuilds its channel objects, and
+    whenever the guild config changes.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._channels = {}
+
+    def get(self, channel_id):
+        """Channel for an ID, or None"""
+        if not channel_id:
+            return None
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self.bot.get_channel(channel_id)
+            if channel is not None:
+                self._channels[channel_id] = channel
+        return channel
+
+    def invalidate(self, channel_id):
+        self._channels.pop(channel_id, None)
+
+    def clear(self):
+        self._channels.clear()
+
+
+class IdempotencyCache:
+    """Runs an operation at most once per key and remembers the result.
+
+    A second call with the same key while the first is still running awaits
+    the same result instead of starting another operation. Completed results
+    are kept in a bounded LRU. Failures are not remembered, so a later retry
+    runs the operation again.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._inflight = {}
+
+    async def run(self, key, operation):
+        """Returns (result, fresh); fresh is False when the result came from an earlier call"""
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key], False
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), False
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on it; retrieve failures so they are not reported as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            result = await operation()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(result)
+        self._results[key] = result
+        if len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return result, True
+
+    def export(self):
+        return list(self._results.items())
+
+    def restore(self, items):
+        for key, result in items[-self.max_entries:]:
+            self._results[key] = result
+
+
+async def send_idempotent(channel, nonce, attempts=2, **kwargs):
+    """channel.send with an enforced nonce, retried on transient errors.
+
+    Discord returns the already-created message when a nonce is reused within
+    a few minutes, so a retry after a lost response never creates a duplicate.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await channel.send(nonce=nonce, **kwargs)
+        except (discord.DiscordServerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"⚠️ Transient error sending to channel {channel.id} (attempt {attempt}), retrying: {e}")
+            await asyncio.sleep(0.5 * attempt)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+from utils.instrumentation import stats
+
+logger = logging.getLogger('AlienBot.profiler')
+
+# Longest profile !profile and /debug/profile will run
+MAX_PROFILE_SECONDS = 60
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _current_task(loop):
+    """Task currently running on `loop`, readable from another thread"""
+    # asyncio.current_task() only works on the loop's own thread; this is the dict it reads.
+    # _current_tasks is a CPython implementation detail that may change between versions,
+    # so samples just go untagged when it is missing.
+    current_tasks = getattr(asyncio.tasks, '_current_tasks', None)
+    return current_tasks.get(loop) if current_tasks is not None else None
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread from a background thread.
+
+    Each sample walks sys._current_frames(); the event loop thread is tagged
+    with the asyncio task running at that moment. Output is in collapsed-stack
+    format ("thread;frame;frame count" per line), which flamegraph.pl and
+    speedscope read directly.
+    """
+
+    def __init__(self, interval=0.005, output_dir=None):
+        self.interval = interval
+        self.output_dir = output_dir or os.getenv("PROFILE_DIR", "profiles")
+        self._running = False
+
+    def _sample(self, seconds, loop, loop_thread_id):
+        stacks = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                root = names.get(thread_id, str(thread_id))
+                if thread_id == loop_thread_id:
+                    task = _current_task(loop)
+                    root += f";task {task.get_name()}" if task is not None else ";idle"
+                stacks[';'.join([root] + frames[::-1])] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    async def profile(self, seconds):
+        """Sample every thread for `seconds` and write a collapsed-stack file; returns (path, samples)"""
+        if self._running:
+            raise RuntimeError("A profile is already running")
+        seconds = max(0.1, min(float(seconds), MAX_PROFILE_SECONDS))
+        self._running = True
+        try:
+            loop = asyncio.get_running_loop()
+            logger.info(f"🔬 Profiling for {seconds:.1f}s")
+            stacks = await asyncio.to_thread(self._sample, seconds, loop, threading.get_ident())
+        finally:
+            self._running = False
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed")
+        text = ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        await asyncio.to_thread(self._write, path, text)
+        logger.info(f"🔬 Profile written to {path} ({sum(stacks.values())} samples)")
+        return path, sum(stacks.values())
+
+    @staticmethod
+    def _write(path, text):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class LoopWatchdog:
+    """Always-on detector for callbacks that block the event loop.
+
+    A task on the loop refreshes a heartbeat timestamp every `interval`
+    seconds and records how late each beat woke up in `lag` (the loop lag
+    histogram shown by !stats and /metrics). A daemon thread checks the heartbeat; once it is older than
+    `threshold`, the loop is stuck inside one callback, so the thread logs the
+    running task and the loop thread's current stack (once per stall) and the
+    total blocked time when the loop recovers.
+    """
+
+    def __init__(self, threshold=0.5, interval=0.1, lag=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = lag
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            if self.lag is not None:
+                self.lag.record(max(0.0, time.monotonic() - self._beat - self.interval))
+
+    def start(self):
+        """Start the heartbeat and the watchdog thread (once); call from the event loop"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info(f"🐕 Loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    def _watch(self):
+        stalled_since = None
+        while not self._loop.is_closed():
+            time.sleep(self.interval)
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if blocked > self.threshold:
+                if stalled_since != beat:
+                    stalled_since = beat
+                    self.stalls += 1
+                    self._report(blocked)
+            elif stalled_since is not None:
+                logger.warning("🐢 Event loop recovered after blocking for %.0fms",
+                               max(0.0, self._beat - stalled_since - self.interval) * 1000)
+                stalled_since = None
+
+    def _report(self, blocked):
+        task = _current_task(self._loop)
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else '(no frame)\n'
+        coro = task.get_coro() if task is not None else None
+        logger.warning("🐢 Event loop blocked for %.0fms in task %s (%s)\n%s",
+                       blocked * 1000, task.get_name() if task is not None else None,
+                       getattr(coro, '__qualname__', coro), stack.rstrip())
+
+    def prometheus_lines(self):
+        return [
+            '# HELP alienbot_loop_stalls_total Times the event loop was blocked longer than the watchdog threshold',
+            '# TYPE alienbot_loop_stalls_total counter',
+            f'alienbot_loop_stalls_total {self.stalls}',
+        ]
+
+
+profiler = SamplingProfiler()
+watchdog = LoopWatchdog(threshold=float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.5")), lag=stats.loop_lag)
@@ -0,0 +1,71 @@
+import ast
+import logging
+import os
+
+import discord
+
+from utils.cog_reload import discover_cogs
+
+logger = logging.getLogger('AlienBot.profiles')
+
+# Intents the command framework itself needs: guild/DM messages with their content
+CORE_INTENTS = ('guilds', 'guild_messages', 'dm_messages', 'message_content')
+
+
+def _class_intents(node):
+    """Literal `required_intents` assigned in a class body, or ()"""
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'required_intents' for target in statement.targets):
+            return ast.literal_eval(statement.value)
+    return ()
+
+
+def declared_intents(cogs_path):
+    """Union of `required_intents` declared by every class in the cogs directory.
+
+    Cog sources are parsed, not imported: load_extension executes each module
+    from its spec anyway, so importing here would run every cog twice at startup.
+    `required_intents` must therefore be a literal tuple of intent names.
+    """
+    names = set()
+    for name in discover_cogs(cogs_path):
+        path = os.path.join(cogs_path, f"{name}.py")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=path)
+            for node in tree.body:
+                if isinstance(node, ast.ClassDef):
+                    names.update(_class_intents(node))
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.error(f"❌ Could not read intents from cog {name}: {e}")
+    return names
+
+
+def client_options(profile, cogs_path, max_messages=200):
+    """Keyword arguments for commands.Bot for the selected BOT_PROFILE.
+
+    - "default": the original setup (default intents + members + message content)
+    - "lean": only the intents the cogs declare, no member cache, a bounded
+      message cache and no member chunking at startup, for large guilds
+    """
+    if profile != "lean":
+        intents = discord.Intents.default()
+        # Enable these privileged intents - REQUIRED for bot to work in channels
+        intents.message_content = True
+        intents.members = True
+        return {'intents': intents}
+
+    intents = discord.Intents.none()
+    for name in CORE_INTENTS + tuple(sorted(declared_intents(cogs_path))):
+        setattr(intents, name, True)
+
+    options = {
+        'intents': intents,
+        'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+        'max_messages': max_messages,
+        'chunk_guilds_at_startup': False,
+    }
+    enabled = [name for name, value in intents if value]
+    logger.info(f"🪶 Lean profile: intents={', '.join(enabled)}, max_messages={max_messages}, member cache={options['member_cache_flags']}")
+    return options
\ No newline at end of file
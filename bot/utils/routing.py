@@ -0,0 +1,69 @@
+import logging
+
+logger = logging.getLogger('AlienBot.routing')
+
+
+def parse_channel_ids(*values):
+    """Parse channel IDs from config strings/ints, skipping empty and invalid values.
+
+    Returns (ids, invalid) where ids is a frozenset of ints and invalid lists the
+    values that could not be parsed.
+    """
+    ids = set()
+    invalid = []
+    for value in values:
+        if value is None or str(value).strip() == "":
+            continue
+        try:
+            ids.add(int(value))
+        except (ValueError, TypeError):
+            invalid.append(value)
+    return frozenset(ids), invalid
+
+
+class ChannelRouter:
+    """Precompiled per-guild channel allow-list.
+
+    The routing table is an immutable (default, {guild_id: frozenset}) pair that
+    is rebuilt off the hot path and swapped in with a single assignment, so
+    lookups never parse config or take locks. A value of None means "respond in
+    every channel".
+    """
+
+    def __init__(self, default=None):
+        self._routes = (default, {})
+
+    @staticmethod
+    def _default_allow_list(defaults):
+        if defaults.notification_channel_id is None:
+            return None  # No notification channel, respond everywhere
+        ids, _ = parse_channel_ids(*defaults)
+        return ids
+
+    @classmethod
+    def from_defaults(cls, defaults):
+        """Build the default allow-list from the default GuildConfig (CHANNEL_ID/POST_CHANNEL_ID)"""
+        return cls(cls._default_allow_list(defaults))
+
+    def allows(self, guild_id, channel_id):
+        """O(1) check whether the bot should respond in a channel"""
+        default, table = self._routes
+        allowed = table.get(guild_id, default)
+        return allowed is None or channel_id in allowed
+
+    def apply_guild_configs(self, configs, defaults):
+        """Rebuild the default allow-list and every guild override from {guild_id: GuildConfig} in one swap.
+
+        Configured channels are added on top of the default allow-list; when
+        the bot responds everywhere by default, guilds stay unrestricted.
+        """
+        default = self._default_allow_list(defaults)
+        if default is None:
+            self._routes = (None, {})
+            return
+        new_table = {}
+        for guild_id, channel_ids in configs.items():
+            ids, _ = parse_channel_ids(*channel_ids)
+            new_table[guild_id] = default | ids
+        self._routes = (default, new_table)
+        logger.info(f"Routing table rebuilt for {len(new_table)} configured guild(s)")
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+
+import discord
+
+logger = logging.getLogger('AlienBot.starter_messages')
+
+
+class StarterMessageResolver:
+    """Finds the starter message of a forum thread with as few REST calls as possible.
+
+    Order of attempts:
+    1. thread.starter_message (the client's message cache)
+    2. the matching gateway MESSAGE_CREATE, awaited for up to `wait_timeout`
+       seconds through a future registry fed from on_message
+    3. a single fetch_message REST call
+
+    Forum starter messages share their ID with the thread and are posted in
+    the thread itself, so both lookups are keyed by thread ID.
+    """
+
+    def __init__(self, wait_timeout=1.5):
+        self.wait_timeout = wait_timeout
+        self._waiters = {}  # thread_id -> Future[Message]
+
+    def feed(self, message):
+        """Call from on_message; resolves a pending waiter for this thread"""
+        if not self._waiters:
+            return
+        future = self._waiters.get(message.channel.id)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def resolve(self, thread, wait_for_gateway=True):
+        """Starter message for a thread, or None. Pass wait_for_gateway=False for old threads."""
+        message = thread.starter_message
+        if message is not None:
+            logger.debug("📦 Starter message for thread %s served from cache", thread.id)
+            return message
+
+        if wait_for_gateway:
+            message = await self._wait_for_gateway(thread)
+            if message is not None:
+                return message
+
+        try:
+            message = await thread.fetch_message(thread.id)
+            logger.debug("🌐 Starter message for thread %s fetched over REST", thread.id)
+            return message
+        except discord.NotFound:
+            return None
+        except discord.HTTPException as e:
+            logger.warning(f"⚠️ Could not fetch starter message for thread {thread.id}: {e}")
+            return None
+
+    async def _wait_for_gateway(self, thread):
+        future = self._waiters.get(thread.id)
+        if future is None:
+            future = self._waiters[thread.id] = asyncio.get_running_loop().create_future()
+        try:
+            message = await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+            logger.debug("📡 Starter message for thread %s received from gateway", thread.id)
+            return message
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if self._waiters.get(thread.id) is future:
+                del self._waiters[thread.id]
\ No newline at end of file
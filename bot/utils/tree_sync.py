@@ -0,0 +1,48 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger('AlienBot.tree_sync')
+
+
+def command_tree_hash(bot):
+    """Content hash of the global application command payloads Discord would receive"""
+    payloads = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    payloads.sort(key=lambda payload: (payload.get('type', 1), payload['name']))
+    blob = json.dumps({'application_id': bot.application_id, 'commands': payloads}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def _read_hash(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write_hash(path, value):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+
+
+async def sync_if_changed(bot, path):
+    """Sync the global command tree only when it differs from the last successful sync.
+
+    Returns True when a sync request was sent to Discord.
+    """
+    current = command_tree_hash(bot)
+    if current == _read_hash(path):
+        logger.info("⏭️ Command tree unchanged since last sync, skipping tree.sync()")
+        return False
+
+    synced = await bot.tree.sync()
+    try:
+        _write_hash(path, current)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not store command tree hash in {path}: {e}")
+    logger.info(f"🌳 Synced {len(synced)} application command(s)")
+    return True
\ No newline at end of file